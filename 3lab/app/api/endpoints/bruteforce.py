@@ -1,9 +1,25 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from pydantic import BaseModel
-from app.celery.tasks import bruteforce_task, NOTIFICATION_CHANNEL
-from app.core.redislite_init import redis_instance
-import json
-import asyncio
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, field_validator, model_validator
+from typing import List, Optional
+# Задачи Celery берутся через модуль: прокси задач в пространстве имен модуля
+# pydantic проверяет при создании моделей, и это запускало бы Redis при импорте
+from app.celery import tasks
+from app.celery.tasks import (
+    start_sharded_job, start_wordlist_job,
+    publish_message, publish_job_message, queue_for_cost, FINAL_MESSAGE_TYPES
+)
+from app.celery.celery_app import celery_app
+from app.core.config import settings
+from app.bruteforce import cache, jobs
+from app.bruteforce.algorithms import HashAlgorithm, detect_algorithm
+from app.bruteforce.keyspace import DEFAULT_CHARSET, DEFAULT_MAX_LENGTH, Keyspace, parse_charset
+from app.bruteforce.progress import format_duration
+from app.bruteforce.wordlist import Wordlist, parse_rules
+from app.bruteforce.lookup_index import get_lookup_index
+from app.schemas.bruteforce_schemas import BruteforceResult
+from app.local.backend import local_backend
+from app.websocket.dispatcher import dispatcher, manager
+import uuid
 import logging
 
 # Настройка логирования
@@ -12,74 +28,462 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-class BruteforceRequest(BaseModel):
+class KeyspaceRequest(BaseModel):
+    """
+    Пространство перебора: алфавит ("?l?d", "abc?d" или просто символы) и
+    диапазон длин либо маска hashcat ("?u?l?l?d?d"), задающая и длину
+    """
+    charset: Optional[str] = None
+    min_length: int = 1
+    max_length: int = DEFAULT_MAX_LENGTH
+    mask: Optional[str] = None
+
+    @model_validator(mode='after')
+    def validate_keyspace(self):
+        # Ошибки разбора (ValueError) pydantic превращает в ответ 422
+        keyspace = self.keyspace()
+        if keyspace.max_length > settings.MAX_PASSWORD_LENGTH:
+            raise ValueError(f"Длина пароля не может превышать {settings.MAX_PASSWORD_LENGTH}")
+        return self
+
+    def keyspace(self) -> Keyspace:
+        if self.mask:
+            return Keyspace(mask=self.mask)
+        charset = parse_charset(self.charset) if self.charset else DEFAULT_CHARSET
+        return Keyspace(charset, self.min_length, self.max_length)
+
+class AlgorithmRequest(BaseModel):
+    """
+    Алгоритм хеша ("md5", "sha1", "sha256"; по умолчанию определяется по длине хеша)
+    и необязательная соль перед паролем ("prefix") или после него ("suffix")
+    """
+    algorithm: Optional[str] = None
+    salt: Optional[str] = None
+    salt_position: str = "prefix"
+
+    def hash_algorithm(self, hash_value: str) -> HashAlgorithm:
+        name = self.algorithm or detect_algorithm(hash_value)
+        return HashAlgorithm(name, self.salt or "", self.salt_position)
+
+class BruteforceRequest(KeyspaceRequest, AlgorithmRequest):
     hash_to_crack: str
     client_id: str
-    max_length: int = 5
+    # Разбить перебор на шарды и выполнить их параллельно на всех воркерах
+    sharded: bool = False
+    # Перебор по словарю из WORDLIST_DIR вместо пространства паролей.
+    # Правила: "lower", "capitalize+append_digit" и т.д. (см. wordlist.RULES)
+    wordlist: Optional[str] = None
+    rules: List[str] = []
+
+    @field_validator('rules')
+    @classmethod
+    def validate_rules(cls, rules):
+        parse_rules(rules)
+        return rules
+
+    @field_validator('hash_to_crack')
+    @classmethod
+    def normalize_hash(cls, hash_to_crack):
+        return hash_to_crack.strip().lower()
+
+    @model_validator(mode='after')
+    def validate_hash(self):
+        self.hash_algorithm(self.hash_to_crack).validate(self.hash_to_crack)
+        return self
+
+class MultiBruteforceRequest(KeyspaceRequest, AlgorithmRequest):
+    hashes: List[str]
+    client_id: str
+
+    @field_validator('hashes')
+    @classmethod
+    def normalize_hashes(cls, hashes):
+        normalized = [hash_value.strip().lower() for hash_value in hashes]
+        if not normalized:
+            raise ValueError("Список хешей пуст")
+        # Убираем дубликаты, сохраняя порядок
+        return list(dict.fromkeys(normalized))
+
+    @model_validator(mode='after')
+    def validate_hashes(self):
+        # Все хеши перебираются за один проход, поэтому алгоритм у них общий
+        algorithm = self.hash_algorithm(self.hashes[0])
+        for hash_value in self.hashes:
+            algorithm.validate(hash_value)
+        return self
+
+def lookup_password(hash_to_crack: str, algorithm: HashAlgorithm):
+    """
+    Ищет пароль в предрасчитанном индексе, не обращаясь к Celery.
+    Индекс строится только для MD5 без соли.
+    """
+    if algorithm.identity() != "md5":
+        return None
+    index = get_lookup_index(settings.LOOKUP_INDEX_PATH)
+    if index is None:
+        return None
+    return index.lookup(hash_to_crack.strip().lower())
+
+def estimate(keyspace: Keyspace) -> dict:
+    """
+    Размер пространства перебора и оценка времени при ESTIMATED_HASH_RATE
+    """
+    size = keyspace.size()
+    seconds = size / settings.ESTIMATED_HASH_RATE
+    return {
+        "keyspace": size,
+        "estimated_seconds": round(seconds, 1),
+        "estimated_time": format_duration(seconds),
+    }
+
+def answer_from_cache(key: str, client_id: str):
+    """
+    Отвечает клиенту результатом из кэша, если он есть
+    """
+    result = cache.get_result(key)
+    if result is None:
+        return None
+
+    password = result["password"]
+    if password is None:
+        publish_message(client_id, "❌ Пароль не найден (из кэша)", "not_found", remember=True)
+        return {"task_id": None, "status": "not_found", "cached": True}
+
+    publish_message(client_id, f"✅ Пароль найден: {password} (из кэша)", "success", remember=True)
+    return {"task_id": None, "status": "cracked", "password": password, "cached": True}
+
+def open_wordlist(name: str, rules: List[str]) -> Wordlist:
+    try:
+        return Wordlist(name, settings.WORDLIST_DIR, rules)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Словарь не найден")
+
+def search_space(params: dict):
+    """
+    Пространство перебора сохраненной задачи: словарь или Keyspace
+    """
+    if params.get("wordlist"):
+        return open_wordlist(params["wordlist"]["name"], params["wordlist"]["rules"])
+    # Задачи, сохраненные до появления настраиваемого пространства, — пространство по умолчанию
+    return Keyspace.from_dict(params.get("keyspace"))
+
+def job_cache_key(params: dict) -> str:
+    algorithm = HashAlgorithm.from_dict(params.get("algorithm"))
+    return cache.result_key(algorithm.identity(), params["hash_to_crack"], search_space(params))
+
+def job_cost(space) -> int:
+    """
+    Оценка стоимости перебора в кандидатах
+    """
+    if isinstance(space, Wordlist):
+        return space.estimated_candidates()
+    return space.size()
+
+# Состояния, после которых задачу уже нельзя отменить
+FINAL_STATUSES = ("cracked", "not_found", "done", "error", "cancelled")
 
+def launch_job(job_id: str, key: str, params: dict) -> dict:
+    """
+    Ставит задачу в очередь. Перебор продолжится с контрольной точки, если она есть.
+    Очередь выбирается по оценке стоимости, чтобы дешевые задачи не ждали за дорогими.
+    """
+    jobs.save_params(job_id, params)
+    cost = job_cost(search_space(params))
+    queue = "local" if settings.EXECUTION_BACKEND == "local" else queue_for_cost(cost)
+    run_id = jobs.start_run(job_id)
+    jobs.update_status(job_id, "queued", client_id=params["client_id"], cost=cost, queue=queue)
+    try:
+        response = submit_job(job_id, run_id, key, params, queue)
+        response.update(cost=cost, queue=queue)
+        return response
+    except Exception:
+        cache.release_inflight(key)
+        raise
+
+def submit_job(job_id: str, run_id: str, key: str, params: dict, queue: str) -> dict:
+    # Локальный пул процессов: без брокера и воркеров Celery
+    if settings.EXECUTION_BACKEND == "local":
+        local_backend.submit(job_id, key, params)
+        return {"task_id": job_id, "status": "started", "backend": "local"}
+
+    if params.get("wordlist"):
+        start_wordlist_job(
+            params["hash_to_crack"],
+            params["client_id"],
+            params["wordlist"],
+            settings.WORDLIST_CHUNK_SIZE,
+            job_id=job_id,
+            run_id=run_id,
+            algorithm=params.get("algorithm"),
+            queue=queue
+        )
+        return {"task_id": job_id, "status": "started", "wordlist": params["wordlist"]["name"]}
+
+    if params["sharded"]:
+        start_sharded_job(
+            params["hash_to_crack"],
+            params["client_id"],
+            settings.BRUTEFORCE_SHARD_SIZE,
+            params.get("keyspace"),
+            job_id=job_id,
+            run_id=run_id,
+            algorithm=params.get("algorithm"),
+            queue=queue
+        )
+        return {"task_id": job_id, "status": "started", "sharded": True}
+
+    # Задача Celery ставится с id запуска: после /cancel и /resume он новый
+    tasks.bruteforce_task.apply_async(
+        args=(
+            params["hash_to_crack"],
+            params["client_id"],
+            params.get("keyspace"),
+            params.get("algorithm")
+        ),
+        kwargs={"job_id": job_id},
+        task_id=run_id,
+        queue=queue
+    )
+    return {"task_id": job_id, "status": "started"}
+
+# Обработчики HTTP обычные функции: запросы к Redis и отправка задач в брокер
+# синхронные, FastAPI выполняет такие обработчики в пуле потоков, не блокируя цикл событий
 @router.post("/start")
-async def start_bruteforce(request: BruteforceRequest):
+def start_bruteforce(request: BruteforceRequest):
     """
     Запускает задачу брутфорса
     """
+    hash_to_crack = request.hash_to_crack
+    keyspace = request.keyspace()
+    algorithm = request.hash_algorithm(hash_to_crack)
+    wordlist = open_wordlist(request.wordlist, request.rules) if request.wordlist else None
+    try:
+        password = lookup_password(hash_to_crack, algorithm)
+        if password is not None:
+            publish_message(
+                request.client_id,
+                f"✅ Пароль найден в индексе: {password}",
+                "success",
+                remember=True
+            )
+            return {"task_id": None, "status": "cracked", "password": password}
+
+        key = cache.result_key(algorithm.identity(), hash_to_crack, wordlist or keyspace)
+        cached = answer_from_cache(key, request.client_id)
+        if cached is not None:
+            return cached
+
+        # Если этот хеш уже перебирается, присоединяемся к существующей задаче
+        job_id = str(uuid.uuid4())
+        existing_job_id = cache.claim_inflight(key, job_id, settings.INFLIGHT_TTL)
+        if existing_job_id is not None:
+            jobs.attach_client(existing_job_id, request.client_id)
+            # Задача могла завершиться до присоединения — тогда результат уже в кэше
+            cached = answer_from_cache(key, request.client_id)
+            if cached is not None:
+                return cached
+            return {"task_id": existing_job_id, "status": "attached"}
+
+        params = {
+            "hash_to_crack": hash_to_crack,
+            "client_id": request.client_id,
+            "sharded": request.sharded,
+            "keyspace": keyspace.to_dict(),
+            "wordlist": wordlist.to_dict() if wordlist else None,
+            "algorithm": algorithm.to_dict(),
+        }
+        response = launch_job(job_id, key, params)
+        if wordlist is None:
+            response.update(estimate(keyspace))
+        return response
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@router.post("/resume/{job_id}")
+def resume_bruteforce(job_id: str, client_id: Optional[str] = None):
+    """
+    Возобновляет прерванную задачу с последней контрольной точки
+    """
+    params = jobs.get_params(job_id)
+    if params is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+
+    client_id = client_id or params["client_id"]
+    key = job_cache_key(params)
     try:
-        task = bruteforce_task.delay(request.hash_to_crack, request.client_id)
-        return {"task_id": task.id, "status": "started"}
+        cached = answer_from_cache(key, client_id)
+        if cached is not None:
+            return cached
+
+        # Если тот же хеш перебирает другая задача, присоединяемся к ней.
+        # Отметка этой же задачи означает, что ее выполнение прервалось.
+        existing_job_id = cache.claim_inflight(key, job_id, settings.INFLIGHT_TTL)
+        if existing_job_id is not None and existing_job_id != job_id:
+            jobs.attach_client(existing_job_id, client_id)
+            return {"task_id": existing_job_id, "status": "attached"}
+
+        if client_id != params["client_id"]:
+            jobs.attach_client(job_id, client_id)
+        response = launch_job(job_id, key, params)
+        response["status"] = "resumed"
+        return response
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@router.post("/start_multi")
+def start_multi_bruteforce(request: MultiBruteforceRequest):
+    """
+    Запускает брутфорс нескольких хешей за один проход
+    """
+    keyspace = request.keyspace()
+    algorithm = request.hash_algorithm(request.hashes[0])
+    try:
+        # Хеши, найденные в индексе или кэше, отдаем сразу и не отправляем в перебор
+        cracked = {}
+        not_found = []
+        for hash_value in request.hashes:
+            source = "индекса"
+            password = lookup_password(hash_value, algorithm)
+            if password is None:
+                source = "кэша"
+                result = cache.get_result(
+                    cache.result_key(algorithm.identity(), hash_value, keyspace)
+                )
+                if result is None:
+                    continue
+                password = result["password"]
+                if password is None:
+                    not_found.append(hash_value)
+                    continue
+
+            cracked[hash_value] = password
+            publish_message(
+                request.client_id,
+                f"✅ {hash_value}: {password} (из {source})",
+                "found",
+                remember=True,
+                hash=hash_value,
+                password=password
+            )
+
+        answered = set(cracked) | set(not_found)
+        remaining = [hash_value for hash_value in request.hashes if hash_value not in answered]
+        if not remaining:
+            publish_message(
+                request.client_id,
+                f"🏁 Найдено {len(cracked)} из {len(request.hashes)} паролей",
+                "done",
+                remember=True,
+                cracked=cracked,
+                not_found=not_found
+            )
+            return {"task_id": None, "status": "cracked", "cracked": cracked, "not_found": not_found}
+
+        task_id = str(uuid.uuid4())
+        cost = keyspace.size()
+        queue = "local" if settings.EXECUTION_BACKEND == "local" else queue_for_cost(cost)
+        jobs.update_status(task_id, "queued", client_id=request.client_id, cost=cost, queue=queue)
+        # Ответы кэша и индекса войдут в итог задачи вместе с найденным перебором
+        answered = {"cracked": cracked, "not_found": not_found}
+        if settings.EXECUTION_BACKEND == "local":
+            local_backend.submit_multi(
+                task_id, remaining, request.client_id, keyspace.to_dict(), algorithm.to_dict(), answered
+            )
+        else:
+            tasks.multi_bruteforce_task.apply_async(
+                args=(remaining, request.client_id, keyspace.to_dict(), algorithm.to_dict(), answered),
+                task_id=task_id,
+                queue=queue
+            )
+        return {
+            "task_id": task_id,
+            "status": "started",
+            "hashes": len(remaining),
+            "cracked": cracked,
+            "not_found": not_found,
+            "cost": cost,
+            "queue": queue,
+            **estimate(keyspace)
+        }
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@router.get("/status/{task_id}", response_model=BruteforceResult)
+def get_task_status(task_id: str):
+    """
+    Текущее состояние задачи: для клиентов, которые не держат WebSocket
+    """
+    status = jobs.get_status(task_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return BruteforceResult(
+        task_id=task_id,
+        status=status.get("status", "queued"),
+        result=status.get("result"),
+        attempts=int(status["attempts"]) if "attempts" in status else None,
+        cost=int(status["cost"]) if "cost" in status else None,
+        queue=status.get("queue")
+    )
+
+@router.post("/cancel/{task_id}")
+def cancel_task(task_id: str):
+    """
+    Отменяет задачу. Запущенные части останавливаются на ближайшей пачке,
+    еще не начатые снимаются с очереди. Контрольные точки сохраняются,
+    поэтому отмененную задачу можно продолжить через /resume.
+    """
+    status = jobs.get_status(task_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    if status.get("status") in FINAL_STATUSES:
+        return {"task_id": task_id, "status": status["status"]}
+
+    try:
+        if not jobs.cancel(task_id):
+            # Задача успела завершиться, пока шел запрос
+            return {"task_id": task_id, "status": jobs.get_status(task_id).get("status")}
+        if settings.EXECUTION_BACKEND != "local":
+            celery_app.control.revoke(jobs.get_task_ids(task_id))
+        params = jobs.get_params(task_id)
+        if params:
+            cache.release_inflight(job_cache_key(params))
+        publish_job_message(task_id, status.get("client_id"), "⛔️ Задача отменена", "cancelled")
+        logger.info(f"Задача {task_id} отменена")
+        return {"task_id": task_id, "status": "cancelled"}
     except Exception as e:
         return {"error": str(e)}, 500
 
 @router.websocket("/ws/{client_id}")
-async def websocket_endpoint(websocket: WebSocket, client_id: str):
+async def websocket_endpoint(websocket: WebSocket, client_id: str, keep_open: bool = False,
+                             job_id: Optional[str] = None):
     """
-    WebSocket эндпоинт для получения обновлений о процессе брутфорса
+    WebSocket эндпоинт для получения обновлений о процессе брутфорса.
+    Сообщения из Redis доставляет общий диспетчер процесса.
+    С keep_open=true сокет не закрывается после первой завершенной задачи:
+    так пакетный клиент получает результаты всех своих задач по одному соединению.
+    С job_id при подключении досылаются только сохраненные сообщения этой задачи.
     """
-    await websocket.accept()
+    dispatcher.ensure_started()
+    await manager.connect(websocket, client_id, persistent=keep_open)
     logger.info(f"WebSocket подключение установлено для клиента {client_id}")
-    
-    # Подписываемся на канал Redis для этого клиента
-    pubsub = redis_instance.pubsub()
-    pubsub.subscribe(NOTIFICATION_CHANNEL)
-    logger.info(f"Подписались на канал {NOTIFICATION_CHANNEL}")
-    
+
     try:
-        # Слушаем сообщения
+        # Сообщения, опубликованные до подключения (ответы из кэша и индекса)
+        for json_data in await dispatcher.pop_pending(client_id, job_id):
+            await websocket.send_json(json_data)
+            if json_data.get("type") in FINAL_MESSAGE_TYPES and not keep_open:
+                await manager.close(client_id)
+                return
+
+        # Ждем отключения клиента; сокет закроет диспетчер после финального сообщения
         while True:
-            try:
-                # Проверяем сообщения Redis
-                message = pubsub.get_message(timeout=1)
-                if message and message["type"] == "message":
-                    data = message["data"]
-                    if isinstance(data, bytes):
-                        data = data.decode("utf-8")
-                    try:
-                        json_data = json.loads(data)
-                        if json_data.get("client_id") == client_id:
-                            await websocket.send_json(json_data)
-                            logger.info(f"Отправлено сообщение клиенту {client_id}: {json_data}")
-                            
-                            # Если это финальное сообщение, закрываем соединение
-                            if json_data.get("type") in ["success", "not_found", "error"]:
-                                logger.info(f"Получено финальное сообщение для клиента {client_id}")
-                                break
-                    except json.JSONDecodeError:
-                        logger.error(f"Ошибка декодирования JSON: {data}")
-                    except Exception as e:
-                        logger.error(f"Ошибка при обработке сообщения: {e}")
-                
-                # Небольшая пауза чтобы не нагружать процессор
-                await asyncio.sleep(0.1)
-                
-            except WebSocketDisconnect:
-                logger.info(f"Клиент {client_id} отключился")
-                break
-            except Exception as e:
-                logger.error(f"Ошибка в цикле обработки сообщений: {e}")
-                break
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        logger.info(f"Клиент {client_id} отключился")
+    except Exception as e:
+        logger.error(f"Ошибка WebSocket соединения клиента {client_id}: {e}")
     finally:
-        # Отписываемся от канала Redis при любом исходе
-        pubsub.unsubscribe(NOTIFICATION_CHANNEL)
-        logger.info(f"Отписались от канала {NOTIFICATION_CHANNEL} для клиента {client_id}")
-        await websocket.close()
+        manager.disconnect(client_id, websocket)
 
 
 # python -m uvicorn app.api.endpoints.bruteforce:router --reload 
@@ -0,0 +1,87 @@
+import hashlib
+from typing import Dict, Optional
+
+# Поддерживаемые хеш-функции
+HASH_FUNCTIONS = {
+    "md5": hashlib.md5,
+    "sha1": hashlib.sha1,
+    "sha256": hashlib.sha256,
+}
+# Алгоритм по длине шестнадцатеричной записи хеша
+ALGORITHM_BY_LENGTH = {
+    hashlib.new(name).digest_size * 2: name
+    for name in HASH_FUNCTIONS
+}
+SALT_POSITIONS = ("prefix", "suffix")
+
+
+def detect_algorithm(hash_value: str) -> str:
+    """
+    Определяет алгоритм по длине хеша (32 — MD5, 40 — SHA-1, 64 — SHA-256)
+    """
+    try:
+        return ALGORITHM_BY_LENGTH[len(hash_value)]
+    except KeyError:
+        raise ValueError(f"Не удалось определить алгоритм по длине хеша: {len(hash_value)}")
+
+
+class HashAlgorithm:
+    """
+    Хеш-функция с необязательной солью: hash(salt + пароль) или hash(пароль + соль).
+
+    Состояние с солью-префиксом считается один раз и копируется для каждого
+    кандидата. Соль-окончание движки дописывают к последнему символу
+    кандидата, поэтому проверка по-прежнему стоит одного update().
+    """
+
+    def __init__(self, name: str = "md5", salt: str = "", salt_position: str = "prefix"):
+        if name not in HASH_FUNCTIONS:
+            raise ValueError(f"Неизвестный алгоритм: {name}")
+        if salt_position not in SALT_POSITIONS:
+            raise ValueError(f"Некорректное положение соли: {salt_position}")
+        self.name = name
+        self.salt = salt
+        self.salt_position = salt_position
+        self.digest_size = hashlib.new(name).digest_size
+        salt_bytes = salt.encode()
+        self.prefix = salt_bytes if salt_position == "prefix" else b""
+        self.suffix = salt_bytes if salt_position == "suffix" else b""
+        self._initial = HASH_FUNCTIONS[name](self.prefix)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> "HashAlgorithm":
+        return cls(**data) if data else cls()
+
+    def to_dict(self) -> Dict:
+        if not self.salt:
+            return {"name": self.name}
+        return {"name": self.name, "salt": self.salt, "salt_position": self.salt_position}
+
+    def identity(self) -> str:
+        """
+        Строка для ключей кэша: тот же хеш с другой солью — другой перебор
+        """
+        if not self.salt:
+            return self.name
+        return f"{self.name}:{self.salt_position}:{self.salt}"
+
+    def validate(self, hash_value: str):
+        if len(hash_value) != self.digest_size * 2 or any(
+                char not in "0123456789abcdef" for char in hash_value.lower()):
+            raise ValueError(f"Некорректный {self.name.upper()} хеш: {hash_value}")
+
+    def new(self, data: bytes = b""):
+        """
+        Состояние хеша после соли-префикса и data (без соли-окончания)
+        """
+        state = self._initial.copy()
+        state.update(data)
+        return state
+
+    def digest(self, candidate: bytes) -> bytes:
+        state = self._initial.copy()
+        state.update(candidate + self.suffix)
+        return state.digest()
+
+    def hexdigest(self, candidate: bytes) -> str:
+        return self.digest(candidate).hex()
@@ -0,0 +1,73 @@
+import hashlib
+import json
+import time
+from typing import Optional
+
+from app.core.redis_client import get_redis
+
+CACHE_INDEX_KEY = "bruteforce:cache:index"
+
+
+def result_key(algorithm: str, hash_to_crack: str, space) -> str:
+    """
+    Ключ результата: один и тот же хеш в другом пространстве перебора
+    (Keyspace или Wordlist) — другой перебор
+    """
+    space_digest = hashlib.sha1(space.identity().encode()).hexdigest()[:12]
+    return f"{algorithm}:{hash_to_crack.lower()}:{space_digest}"
+
+
+def get_result(key: str) -> Optional[dict]:
+    """
+    Возвращает {"password": str | None} или None, если результата нет в кэше
+    """
+    data = get_redis().get(f"bruteforce:cache:{key}")
+    if data is None:
+        return None
+    return json.loads(data)
+
+
+def store_result(key: str, password: Optional[str], ttl: int, max_size: int):
+    """
+    Сохраняет результат перебора. Размер кэша ограничен: при переполнении
+    удаляются самые старые записи.
+    """
+    pipe = get_redis().pipeline()
+    pipe.set(f"bruteforce:cache:{key}", json.dumps({"password": password}), ex=ttl)
+    pipe.zadd(CACHE_INDEX_KEY, {key: time.time()})
+    pipe.zcard(CACHE_INDEX_KEY)
+    size = pipe.execute()[-1]
+
+    if size > max_size:
+        evicted = get_redis().zpopmin(CACHE_INDEX_KEY, size - max_size)
+        if evicted:
+            get_redis().delete(*[
+                f"bruteforce:cache:{member.decode() if isinstance(member, bytes) else member}"
+                for member, _ in evicted
+            ])
+
+
+def claim_inflight(key: str, job_id: str, ttl: int) -> Optional[str]:
+    """
+    Регистрирует задачу как выполняющую перебор для ключа.
+    Если перебор уже идет, возвращает идентификатор существующей задачи.
+    """
+    inflight_key = f"bruteforce:inflight:{key}"
+    if get_redis().set(inflight_key, job_id, nx=True, ex=ttl):
+        return None
+    existing = get_redis().get(inflight_key)
+    if existing is None:
+        # Задача завершилась между SET и GET — пробуем еще раз
+        return claim_inflight(key, job_id, ttl)
+    return existing.decode() if isinstance(existing, bytes) else existing
+
+
+def touch_inflight(key: str, ttl: int):
+    """
+    Продлевает отметку выполняющегося перебора (длинные задачи, повторы после чекпоинта)
+    """
+    get_redis().expire(f"bruteforce:inflight:{key}", ttl)
+
+
+def release_inflight(key: str):
+    get_redis().delete(f"bruteforce:inflight:{key}")
@@ -0,0 +1,70 @@
+import json
+import time
+from typing import Optional
+
+from app.core.redis_client import get_redis
+
+
+def checkpoint_key(key: str, shard: Optional[dict] = None) -> str:
+    """
+    Ключ контрольной точки. Привязан к параметрам перебора, а не к задаче,
+    поэтому повторно отправленный запрос продолжает с того же места.
+    """
+    if shard is None:
+        return f"bruteforce:checkpoint:{key}"
+    # Шард пространства паролей или диапазон байтов словаря
+    shard_id = ":".join(str(value) for value in shard.values())
+    return f"bruteforce:checkpoint:{key}:{shard_id}"
+
+
+def load_checkpoint(name: str) -> Optional[dict]:
+    data = get_redis().get(name)
+    if data is None:
+        return None
+    return json.loads(data)
+
+
+def save_checkpoint(name: str, state: dict, ttl: int):
+    get_redis().set(name, json.dumps(state), ex=ttl)
+
+
+def clear_checkpoint(name: str):
+    get_redis().delete(name)
+
+
+def clear_checkpoints(key: str):
+    """
+    Удаляет контрольные точки перебора и всех его шардов
+    """
+    base = checkpoint_key(key)
+    names = [base, *get_redis().scan_iter(match=f"{base}:*")]
+    get_redis().delete(*names)
+
+
+class Checkpointer:
+    """
+    Сохраняет позицию перебора не чаще, чем раз в interval секунд
+    """
+
+    def __init__(self, name: str, interval: float, ttl: int):
+        self.name = name
+        self.interval = interval
+        self.ttl = ttl
+        self.last_saved = time.monotonic()
+
+    def load(self) -> Optional[dict]:
+        return load_checkpoint(self.name)
+
+    def maybe_save(self, state: dict) -> bool:
+        now = time.monotonic()
+        if now - self.last_saved < self.interval:
+            return False
+        self.save(state)
+        return True
+
+    def save(self, state: dict):
+        save_checkpoint(self.name, state, self.ttl)
+        self.last_saved = time.monotonic()
+
+    def clear(self):
+        clear_checkpoint(self.name)
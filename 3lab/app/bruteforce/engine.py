@@ -0,0 +1,179 @@
+import itertools
+from typing import Iterator, Iterable, NamedTuple, Optional, Dict
+
+from app.bruteforce.algorithms import HashAlgorithm
+from app.bruteforce.keyspace import Keyspace, index_to_candidate
+
+# Сколько кандидатов проверяется между возвратами управления вызывающему коду
+DEFAULT_BATCH_SIZE = 65536
+
+
+class SearchBatch(NamedTuple):
+    """
+    Результат проверки очередной пачки кандидатов
+    """
+    checked: int
+    found: Optional[str]
+    current: str
+
+
+class MultiSearchBatch(NamedTuple):
+    """
+    Результат проверки пачки кандидатов сразу против нескольких хешей
+    """
+    checked: int
+    found: Dict[str, str]
+    current: str
+
+
+class BaseEngine:
+    """
+    Общий интерфейс движков перебора
+    """
+    name = ""
+
+    def __init__(self, keyspace: Keyspace, batch_size: int = DEFAULT_BATCH_SIZE,
+                 algorithm: Optional[HashAlgorithm] = None):
+        self.keyspace = keyspace
+        self.batch_size = batch_size
+        self.algorithm = algorithm or HashAlgorithm()
+
+    def search_many(self, hashes: Iterable[str], shard: Dict) -> Iterator[MultiSearchBatch]:
+        """
+        Перебирает шард один раз, проверяя каждого кандидата по всем хешам.
+        Пачка с найденными паролями возвращается сразу после совпадения.
+        Перебор останавливается, когда найдены все хеши.
+        """
+        raise NotImplementedError
+
+    def search(self, hash_to_crack: str, shard: Dict) -> Iterator[SearchBatch]:
+        for batch in self.search_many([hash_to_crack], shard):
+            yield SearchBatch(batch.checked, batch.found.get(hash_to_crack.lower()), batch.current)
+
+
+class ReferenceEngine(BaseEngine):
+    """
+    Эталонный перебор: строка -> encode -> хеш -> hexdigest для каждого кандидата.
+    Оставлен для сравнения скорости с оптимизированным движком.
+    """
+    name = "reference"
+
+    def search_many(self, hashes: Iterable[str], shard: Dict) -> Iterator[MultiSearchBatch]:
+        targets = {hash_value.lower() for hash_value in hashes}
+        checked = 0
+        password = ""
+        for guess in self.keyspace.iter_shard(shard):
+            password = guess
+            guess_hash = self.algorithm.hexdigest(password.encode())
+            checked += 1
+            if guess_hash in targets:
+                targets.discard(guess_hash)
+                yield MultiSearchBatch(checked, {guess_hash: password}, password)
+                checked = 0
+                if not targets:
+                    return
+            if checked == self.batch_size:
+                yield MultiSearchBatch(checked, {}, password)
+                checked = 0
+        if checked:
+            yield MultiSearchBatch(checked, {}, password)
+
+
+class PrefixEngine(BaseEngine):
+    """
+    Перебор с инкрементальным хешированием префикса.
+
+    Состояние хеша для общего префикса считается один раз и копируется через
+    .copy() для каждого последнего символа, кандидаты генерируются сразу
+    в байтах, а сырой digest() ищется в словаре целевых хешей,
+    декодированных один раз.
+    """
+    name = "prefix"
+
+    def _encoded_positions(self, length: int) -> list:
+        return [[char.encode() for char in chars] for chars in self.keyspace.positions(length)]
+
+    def search_many(self, hashes: Iterable[str], shard: Dict) -> Iterator[MultiSearchBatch]:
+        targets = {bytes.fromhex(hash_value): hash_value.lower() for hash_value in hashes}
+        positions = self.keyspace.positions(shard["length"])
+        prefix_length = shard["prefix_length"]
+        suffix_length = shard["length"] - prefix_length
+        prefix_positions = positions[:prefix_length]
+        encoded = self._encoded_positions(shard["length"])
+        middle_positions = encoded[prefix_length:-1]
+        # Соль-окончание дописывается к последнему символу: проверка остается одним update()
+        last_chars = encoded[-1]
+        chars = [char + self.algorithm.suffix for char in last_chars]
+        checked = 0
+        current = b""
+
+        for prefix_index in range(shard["start"], shard["stop"]):
+            prefix = index_to_candidate(prefix_index, prefix_positions).encode()
+            prefix_state = self.algorithm.new(prefix)
+            current = prefix
+
+            if suffix_length == 0:
+                checked += 1
+                hash_value = targets.pop(self.algorithm.digest(prefix), None)
+                if hash_value is not None:
+                    yield MultiSearchBatch(checked, {hash_value: prefix.decode()}, prefix.decode())
+                    checked = 0
+                    if not targets:
+                        return
+                continue
+
+            # states[i] — состояние хеша после префикса и i символов середины
+            states = [prefix_state]
+            previous = None
+            for middle in itertools.product(*middle_positions):
+                # Пересчитываем состояния только начиная с изменившейся позиции
+                changed = 0
+                if previous is not None:
+                    while middle[changed] == previous[changed]:
+                        changed += 1
+                del states[changed + 1:]
+                for char in middle[changed:]:
+                    state = states[-1].copy()
+                    state.update(char)
+                    states.append(state)
+                previous = middle
+                current = prefix + b''.join(middle)
+
+                copy = states[-1].copy
+                for char in chars:
+                    state = copy()
+                    state.update(char)
+                    if state.digest() in targets:
+                        position = chars.index(char)
+                        password = (current + last_chars[position]).decode()
+                        hash_value = targets.pop(state.digest())
+                        yield MultiSearchBatch(checked + position + 1, {hash_value: password}, password)
+                        if not targets:
+                            return
+                        # Оставшиеся символы этой пачки учтутся ниже
+                        checked = -(position + 1)
+
+                checked += len(chars)
+                if checked >= self.batch_size:
+                    yield MultiSearchBatch(checked, {}, current.decode())
+                    checked = 0
+
+        if checked:
+            yield MultiSearchBatch(checked, {}, current.decode())
+
+
+ENGINES = {
+    ReferenceEngine.name: ReferenceEngine,
+    PrefixEngine.name: PrefixEngine,
+}
+
+
+def get_engine(name: str, keyspace: Keyspace, batch_size: int = DEFAULT_BATCH_SIZE,
+               algorithm: Optional[HashAlgorithm] = None):
+    """
+    Создает движок перебора по имени
+    """
+    try:
+        return ENGINES[name](keyspace, batch_size, algorithm)
+    except KeyError:
+        raise ValueError(f"Неизвестный движок перебора: {name}")
@@ -0,0 +1,240 @@
+import json
+import time
+import uuid
+from typing import Optional
+
+from app.core.redis_client import get_redis
+
+# Время жизни служебных ключей задачи в Redis
+JOB_TTL = 24 * 60 * 60
+
+
+def job_key(job_id: str, name: str) -> str:
+    """
+    Имя ключа Redis для состояния задачи
+    """
+    return f"bruteforce:job:{job_id}:{name}"
+
+
+def register_shards(job_id: str, task_ids: list):
+    """
+    Сохраняет идентификаторы подзадач шардированной задачи
+    """
+    pipe = get_redis().pipeline()
+    # При возобновлении задачи шарды регистрируются заново, итог и счетчик сбрасывает start_run
+    pipe.delete(job_key(job_id, "shards"))
+    pipe.rpush(job_key(job_id, "shards"), *task_ids)
+    pipe.set(job_key(job_id, "total"), len(task_ids))
+    # Время старта и уже сделанные попытки нужны шардам для расчета скорости
+    pipe.set(job_key(job_id, "started"), time.time())
+    pipe.get(job_key(job_id, "attempts"))
+    pipe.set(job_key(job_id, "resumed_attempts"), 0)
+    for name in ("shards", "total", "started", "resumed_attempts"):
+        pipe.expire(job_key(job_id, name), JOB_TTL)
+    attempts = pipe.execute()[4]
+    if attempts is not None:
+        get_redis().set(job_key(job_id, "resumed_attempts"), attempts, ex=JOB_TTL)
+
+
+def get_timing(job_id: str) -> tuple:
+    """
+    Время старта шардированной задачи и число попыток до ее возобновления
+    """
+    started, resumed_attempts = get_redis().mget(
+        job_key(job_id, "started"), job_key(job_id, "resumed_attempts")
+    )
+    return (
+        float(started) if started is not None else None,
+        int(resumed_attempts) if resumed_attempts is not None else 0
+    )
+
+
+def claim_progress_slot(job_id: str, interval: float) -> bool:
+    """
+    Разрешает отправить прогресс только одному шарду задачи за интервал
+    """
+    return bool(get_redis().set(
+        job_key(job_id, "progress_slot"), 1, nx=True, px=max(int(interval * 1000), 1)
+    ))
+
+
+def save_params(job_id: str, params: dict):
+    """
+    Сохраняет параметры запуска, чтобы задачу можно было возобновить
+    """
+    get_redis().set(job_key(job_id, "params"), json.dumps(params), ex=JOB_TTL)
+
+
+def get_params(job_id: str) -> Optional[dict]:
+    data = get_redis().get(job_key(job_id, "params"))
+    if data is None:
+        return None
+    return json.loads(data)
+
+
+def start_run(job_id: str) -> str:
+    """
+    Начинает новый запуск задачи (первый или после /resume): сбрасывает итог
+    прошлого запуска и выдает новый id. С ним ставится задача Celery: отозванный
+    /cancel id воркеры отбрасывают. Части прошлого запуска, увидев новый id,
+    останавливаются и не учитываются в итоге нового.
+    """
+    run_id = str(uuid.uuid4())
+    pipe = get_redis().pipeline()
+    pipe.set(job_key(job_id, "run"), run_id, ex=JOB_TTL)
+    pipe.delete(job_key(job_id, "result"), job_key(job_id, "done"))
+    pipe.execute()
+    return run_id
+
+
+def stop_reason(job_id: str, run_id: Optional[str] = None) -> Optional[str]:
+    """
+    Почему части задачи пора остановиться: "finished" — пароль найден, задача
+    отменена или завершилась с ошибкой, "restarted" — задача запущена заново.
+    None, если перебор продолжается.
+    """
+    pipe = get_redis().pipeline()
+    pipe.exists(job_key(job_id, "result"))
+    pipe.get(job_key(job_id, "run"))
+    finished, current = pipe.execute()
+    if finished:
+        return "finished"
+    if run_id is not None and current is not None:
+        current = current.decode() if isinstance(current, bytes) else current
+        if current != run_id:
+            return "restarted"
+    return None
+
+
+def get_task_ids(job_id: str) -> list:
+    """
+    Идентификаторы задач Celery текущего запуска: основная задача и шарды.
+    Задачи без запусков (несколько хешей) поставлены с id, равным job_id.
+    """
+    run_id = get_redis().get(job_key(job_id, "run"))
+    if run_id is None:
+        run_id = job_id
+    elif isinstance(run_id, bytes):
+        run_id = run_id.decode()
+    return [run_id] + get_shard_ids(job_id)
+
+
+def get_shard_ids(job_id: str) -> list:
+    return [
+        task_id.decode() if isinstance(task_id, bytes) else task_id
+        for task_id in get_redis().lrange(job_key(job_id, "shards"), 0, -1)
+    ]
+
+
+def mark_finished(job_id: str, result: str) -> bool:
+    """
+    Отмечает задачу как завершенную (пароль найден или произошла ошибка).
+    Возвращает True только для первого шарда, чтобы итог был опубликован один раз.
+    """
+    return bool(get_redis().set(job_key(job_id, "result"), result, nx=True, ex=JOB_TTL))
+
+
+def is_finished(job_id: str) -> bool:
+    return bool(get_redis().exists(job_key(job_id, "result")))
+
+
+def add_attempts(job_id: str, attempts: int) -> int:
+    """
+    Добавляет попытки шарда к общему счетчику задачи
+    """
+    pipe = get_redis().pipeline()
+    pipe.incrby(job_key(job_id, "attempts"), attempts)
+    pipe.expire(job_key(job_id, "attempts"), JOB_TTL)
+    return pipe.execute()[0]
+
+
+def get_attempts(job_id: str) -> int:
+    """
+    Попытки всех шардов задачи
+    """
+    attempts = get_redis().get(job_key(job_id, "attempts"))
+    return int(attempts) if attempts is not None else 0
+
+
+def add_processed(job_id: str, attempts: int, processed: int) -> tuple:
+    """
+    Добавляет попытки и пройденные байты словаря к общим счетчикам задачи
+    """
+    pipe = get_redis().pipeline()
+    pipe.incrby(job_key(job_id, "attempts"), attempts)
+    pipe.incrby(job_key(job_id, "processed"), processed)
+    pipe.expire(job_key(job_id, "attempts"), JOB_TTL)
+    pipe.expire(job_key(job_id, "processed"), JOB_TTL)
+    total_attempts, total_processed, _, _ = pipe.execute()
+    return total_attempts, total_processed
+
+
+def finish_shard(job_id: str) -> bool:
+    """
+    Отмечает шард завершенным. Возвращает True, если это был последний шард.
+    """
+    pipe = get_redis().pipeline()
+    pipe.incr(job_key(job_id, "done"))
+    pipe.expire(job_key(job_id, "done"), JOB_TTL)
+    pipe.get(job_key(job_id, "total"))
+    done, _, total = pipe.execute()
+    return total is not None and done >= int(total)
+
+
+def attach_client(job_id: str, client_id: str):
+    """
+    Подписывает клиента на уведомления уже запущенной задачи
+    """
+    pipe = get_redis().pipeline()
+    pipe.sadd(job_key(job_id, "clients"), client_id)
+    pipe.expire(job_key(job_id, "clients"), JOB_TTL)
+    pipe.execute()
+
+
+def get_clients(job_id: str, client_id: str) -> set:
+    """
+    Все получатели уведомлений задачи: владелец и присоединившиеся клиенты
+    """
+    clients = {
+        member.decode() if isinstance(member, bytes) else member
+        for member in get_redis().smembers(job_key(job_id, "clients"))
+    }
+    clients.add(client_id)
+    return clients
+
+
+def update_status(job_id: str, status: Optional[str] = None, **fields):
+    """
+    Обновляет запись о состоянии задачи (для /status). Поля со значением None пропускаются.
+    """
+    mapping = {name: value for name, value in fields.items() if value is not None}
+    if status is not None:
+        mapping["status"] = status
+    if not mapping:
+        return
+    pipe = get_redis().pipeline()
+    pipe.hset(job_key(job_id, "status"), mapping=mapping)
+    pipe.expire(job_key(job_id, "status"), JOB_TTL)
+    pipe.execute()
+
+
+def get_status(job_id: str) -> Optional[dict]:
+    data = get_redis().hgetall(job_key(job_id, "status"))
+    if not data:
+        return None
+    return {
+        (name.decode() if isinstance(name, bytes) else name): (value.decode() if isinstance(value, bytes) else value)
+        for name, value in data.items()
+    }
+
+
+def cancel(job_id: str) -> bool:
+    """
+    Отменяет задачу: выполняющиеся части останавливаются при следующей проверке
+    is_finished(). Возвращает False, если задача уже завершилась.
+    """
+    if not mark_finished(job_id, ""):
+        return False
+    update_status(job_id, "cancelled")
+    return True
+
@@ -0,0 +1,260 @@
+import itertools
+import math
+import string
+from typing import Iterator, List, Dict, Tuple, Optional
+
+# Алфавит по умолчанию: строчные, прописные буквы и цифры
+DEFAULT_CHARSET = string.ascii_letters + string.digits
+DEFAULT_MAX_LENGTH = 5
+
+# Встроенные наборы символов в стиле hashcat
+CHARSET_CLASSES = {
+    "l": string.ascii_lowercase,
+    "u": string.ascii_uppercase,
+    "d": string.digits,
+    "s": " " + string.punctuation,
+    "h": "0123456789abcdef",
+    "H": "0123456789ABCDEF",
+}
+CHARSET_CLASSES["a"] = CHARSET_CLASSES["l"] + CHARSET_CLASSES["u"] + CHARSET_CLASSES["d"] + CHARSET_CLASSES["s"]
+
+
+def _parse_tokens(spec: str) -> List[str]:
+    """
+    Разбирает строку на позиции: "?x" — встроенный набор, "??" — сам символ "?",
+    любой другой символ — литерал
+    """
+    tokens = []
+    position = 0
+    while position < len(spec):
+        char = spec[position]
+        if char != "?":
+            tokens.append(char)
+            position += 1
+            continue
+        if position + 1 >= len(spec):
+            raise ValueError("Маска не может заканчиваться на '?'")
+        name = spec[position + 1]
+        if name == "?":
+            tokens.append("?")
+        elif name in CHARSET_CLASSES:
+            tokens.append(CHARSET_CLASSES[name])
+        else:
+            raise ValueError(f"Неизвестный набор символов: ?{name}")
+        position += 2
+    return tokens
+
+
+def parse_charset(spec: str) -> str:
+    """
+    Алфавит из описания вида "?l?d" или "abc?d". Повторы символов удаляются.
+    """
+    charset = "".join(dict.fromkeys("".join(_parse_tokens(spec))))
+    if not charset:
+        raise ValueError("Алфавит пуст")
+    if not charset.isascii():
+        raise ValueError("Поддерживаются только ASCII символы")
+    return charset
+
+
+def parse_mask(mask: str) -> List[str]:
+    """
+    Маска hashcat ("?l?l?d?d", "pass?d?d"): набор допустимых символов для каждой позиции
+    """
+    positions = _parse_tokens(mask)
+    if not positions:
+        raise ValueError("Маска пуста")
+    if not all(chars.isascii() for chars in positions):
+        raise ValueError("Поддерживаются только ASCII символы")
+    return positions
+
+
+def keyspace_size(positions: List[str]) -> int:
+    """
+    Количество кандидатов с заданными наборами символов по позициям
+    """
+    return math.prod(len(chars) for chars in positions)
+
+
+def index_to_candidate(index: int, positions: List[str]) -> str:
+    """
+    Переводит номер кандидата (в порядке itertools.product) в строку
+    """
+    chars = []
+    for position_chars in reversed(positions):
+        index, rest = divmod(index, len(position_chars))
+        chars.append(position_chars[rest])
+    return ''.join(reversed(chars))
+
+
+class Keyspace:
+    """
+    Пространство перебора: алфавит и диапазон длин либо маска.
+    Передается в задачи Celery как словарь (to_dict/from_dict).
+    """
+
+    def __init__(self, charset: str = DEFAULT_CHARSET, min_length: int = 1,
+                 max_length: int = DEFAULT_MAX_LENGTH, mask: Optional[str] = None):
+        self.mask = mask
+        if mask:
+            self._mask_positions = parse_mask(mask)
+            self.charset = ""
+            self.min_length = self.max_length = len(self._mask_positions)
+        else:
+            self._mask_positions = None
+            self.charset = charset
+            self.min_length = min_length
+            self.max_length = max_length
+            if not charset:
+                raise ValueError("Алфавит пуст")
+            if min_length < 1 or max_length < min_length:
+                raise ValueError("Некорректный диапазон длин пароля")
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> "Keyspace":
+        return cls(**data) if data else cls()
+
+    def to_dict(self) -> Dict:
+        if self.mask:
+            return {"mask": self.mask}
+        return {"charset": self.charset, "min_length": self.min_length, "max_length": self.max_length}
+
+    def identity(self) -> str:
+        """
+        Строка, однозначно описывающая пространство (для ключей кэша)
+        """
+        if self.mask:
+            return f"mask:{self.mask}"
+        return f"charset:{self.charset}:{self.min_length}:{self.max_length}"
+
+    def lengths(self) -> range:
+        return range(self.min_length, self.max_length + 1)
+
+    def positions(self, length: int) -> List[str]:
+        if self._mask_positions is not None:
+            return self._mask_positions
+        return [self.charset] * length
+
+    def size(self) -> int:
+        return sum(keyspace_size(self.positions(length)) for length in self.lengths())
+
+    @staticmethod
+    def full_shard(length: int) -> Dict:
+        """
+        Шард, покрывающий все пароли заданной длины
+        """
+        return {"length": length, "prefix_length": 0, "start": 0, "stop": 1}
+
+    def _shard_layout(self, length: int, shard_size: int) -> Tuple[int, int, int]:
+        """
+        Разбиение паролей длины length: длина префикса, число префиксов и префиксов на шард
+        """
+        positions = self.positions(length)
+        # Подбираем минимальную длину префикса, при которой хвост помещается в шард
+        prefix_length = 0
+        while prefix_length < length and keyspace_size(positions[prefix_length:]) > shard_size:
+            prefix_length += 1
+
+        prefix_count = keyspace_size(positions[:prefix_length])
+        suffix_size = keyspace_size(positions[prefix_length:])
+        return prefix_length, prefix_count, max(1, shard_size // suffix_size)
+
+    def count_shards(self, shard_size: int) -> int:
+        """
+        Сколько шардов вернет split с тем же размером шарда
+        """
+        total = 0
+        for length in self.lengths():
+            _, prefix_count, prefixes_per_shard = self._shard_layout(length, shard_size)
+            total += -(-prefix_count // prefixes_per_shard)
+        return total
+
+    def fit_shard_size(self, shard_size: int, max_shards: int) -> int:
+        """
+        Увеличивает размер шарда, пока шардов не станет не больше max_shards.
+        Меньше одного шарда на длину пароля не бывает, поэтому при очень малом
+        max_shards результат ограничен размером всего пространства.
+        """
+        size = self.size()
+        while shard_size < size and self.count_shards(shard_size) > max_shards:
+            shard_size *= 2
+        return shard_size
+
+    def split(self, shard_size: int) -> Iterator[Dict]:
+        """
+        Делит пространство перебора на шарды по длине и диапазону префиксов.
+
+        Шард описывается словарем {"length", "prefix_length", "start", "stop"}:
+        перебираются все пароли длины length, префикс длины prefix_length
+        которых имеет номер в диапазоне [start, stop).
+        Шарды выдаются по одному: их число заранее считает count_shards.
+        """
+        for length in self.lengths():
+            prefix_length, prefix_count, prefixes_per_shard = self._shard_layout(length, shard_size)
+            for start in range(0, prefix_count, prefixes_per_shard):
+                yield {
+                    "length": length,
+                    "prefix_length": prefix_length,
+                    "start": start,
+                    "stop": min(start + prefixes_per_shard, prefix_count),
+                }
+
+    def shard_size(self, shard: Dict) -> int:
+        """
+        Количество кандидатов в шарде
+        """
+        positions = self.positions(shard["length"])
+        return (shard["stop"] - shard["start"]) * keyspace_size(positions[shard["prefix_length"]:])
+
+    def iter_shard(self, shard: Dict) -> Iterator[str]:
+        """
+        Перебирает кандидатов шарда в лексикографическом порядке
+        """
+        positions = self.positions(shard["length"])
+        prefix_positions = positions[:shard["prefix_length"]]
+        suffix_positions = positions[shard["prefix_length"]:]
+        for prefix_index in range(shard["start"], shard["stop"]):
+            prefix = index_to_candidate(prefix_index, prefix_positions)
+            for suffix in itertools.product(*suffix_positions):
+                yield prefix + ''.join(suffix)
+
+    def resume_shards(self, shard: Dict, position: int) -> Tuple[int, List[Dict]]:
+        """
+        Шарды, покрывающие остаток шарда начиная с кандидата номер position.
+
+        Позиция выравнивается вниз до целого последнего символа, поэтому
+        после возобновления повторно проверяется меньше кандидатов, чем
+        символов в последней позиции. Возвращает выровненную позицию и список
+        шардов: "голову" до ближайшей границы исходных префиксов и "хвост"
+        в исходной сетке.
+        """
+        length = shard["length"]
+        suffix_length = length - shard["prefix_length"]
+        if position <= 0:
+            return 0, [shard]
+
+        if suffix_length == 0:
+            start = min(shard["start"] + position, shard["stop"])
+            return start - shard["start"], [dict(shard, start=start)] if start < shard["stop"] else []
+
+        positions = self.positions(length)
+        base = len(positions[-1])
+        position -= position % base
+        suffix_size = keyspace_size(positions[shard["prefix_length"]:])
+        # Номер первого непроверенного кандидата среди всех кандидатов длины length
+        first = shard["start"] * suffix_size + position
+        # Ближайшая граница префикса исходного шарда
+        next_prefix = min(-(-first // suffix_size), shard["stop"])
+
+        shards = []
+        head_stop = next_prefix * (suffix_size // base)
+        if first // base < head_stop:
+            shards.append({
+                "length": length,
+                "prefix_length": length - 1,
+                "start": first // base,
+                "stop": head_stop,
+            })
+        if next_prefix < shard["stop"]:
+            shards.append(dict(shard, start=next_prefix))
+        return position, shards
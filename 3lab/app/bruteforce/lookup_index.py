@@ -0,0 +1,203 @@
+import argparse
+import hashlib
+import itertools
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Optional
+
+from app.bruteforce.keyspace import DEFAULT_CHARSET, index_to_candidate
+
+# Формат файла: заголовок фиксированного размера, затем записи
+# (md5 digest, 16 байт) + (номер кандидата, uint32 big-endian), отсортированные по digest
+MAGIC = b"BFIDX001"
+HEADER_FORMAT = "<8sBB"
+HEADER_SIZE = 256
+DIGEST_SIZE = 16
+RECORD_SIZE = DIGEST_SIZE + 4
+# Сколько записей копить в памяти для корзины перед сбросом на диск
+FLUSH_RECORDS = 4096
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "lookup.idx"
+)
+
+
+def _length_offsets(charset: str, max_length: int) -> list:
+    """
+    offsets[length] — номер первого кандидата данной длины в сквозной нумерации
+    """
+    offsets = [0, 0]
+    for length in range(1, max_length + 1):
+        offsets.append(offsets[-1] + len(charset) ** length)
+    return offsets
+
+
+def build_index(path: str, charset: str = DEFAULT_CHARSET, max_length: int = 4):
+    """
+    Строит отсортированную таблицу digest -> номер кандидата для длин 1..max_length.
+
+    Сортировка внешняя: записи раскладываются по 256 временным файлам
+    по первому байту digest, затем каждая корзина сортируется в памяти.
+    """
+    offsets = _length_offsets(charset, max_length)
+    if offsets[-1] >= 2 ** 32:
+        raise ValueError("Пространство слишком велико для 32-битных номеров кандидатов")
+    if len(charset) > HEADER_SIZE - struct.calcsize(HEADER_FORMAT):
+        raise ValueError("Алфавит не помещается в заголовок индекса")
+
+    chars = [char.encode() for char in charset]
+    pack_index = struct.Struct(">I").pack
+    directory = os.path.dirname(os.path.abspath(path))
+
+    with tempfile.TemporaryDirectory(dir=directory) as temp_dir:
+        buckets = [open(os.path.join(temp_dir, f"{bucket:02x}"), "wb") for bucket in range(256)]
+        buffers = [[] for _ in range(256)]
+
+        def add(digest: bytes, index: int):
+            buffer = buffers[digest[0]]
+            buffer.append(digest + pack_index(index))
+            if len(buffer) >= FLUSH_RECORDS:
+                buckets[digest[0]].write(b"".join(buffer))
+                buffer.clear()
+
+        try:
+            index = 0
+            for length in range(1, max_length + 1):
+                # Переиспользуем состояние MD5 для всех символов, кроме последнего
+                for prefix in itertools.product(chars, repeat=length - 1):
+                    copy = hashlib.md5(b"".join(prefix)).copy
+                    for char in chars:
+                        state = copy()
+                        state.update(char)
+                        add(state.digest(), index)
+                        index += 1
+
+            for bucket, buffer in zip(buckets, buffers):
+                bucket.write(b"".join(buffer))
+        finally:
+            for bucket in buckets:
+                bucket.close()
+
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as output:
+            header = struct.pack(HEADER_FORMAT, MAGIC, max_length, len(charset)) + charset.encode()
+            output.write(header.ljust(HEADER_SIZE, b"\0"))
+            for bucket in range(256):
+                with open(os.path.join(temp_dir, f"{bucket:02x}"), "rb") as bucket_file:
+                    data = bucket_file.read()
+                records = sorted(data[i:i + RECORD_SIZE] for i in range(0, len(data), RECORD_SIZE))
+                output.write(b"".join(records))
+        # Подменяем файл атомарно, чтобы читатели не увидели недописанный индекс
+        os.replace(temp_path, path)
+
+    return offsets[-1]
+
+
+class LookupIndex:
+    """
+    Поиск пароля по MD5 через memory-mapped индекс.
+    Файл не загружается в память процесса: страницы читаются ОС по требованию
+    и разделяются между процессами через page cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.max_length, charset_length = struct.unpack_from(HEADER_FORMAT, self._map)
+        if magic != MAGIC:
+            raise ValueError(f"Файл {path} не является индексом брутфорса")
+        charset_start = struct.calcsize(HEADER_FORMAT)
+        self.charset = self._map[charset_start:charset_start + charset_length].decode()
+        self.count = (len(self._map) - HEADER_SIZE) // RECORD_SIZE
+        self._offsets = _length_offsets(self.charset, self.max_length)
+
+    def _candidate(self, index: int) -> str:
+        length = 1
+        while self._offsets[length + 1] <= index:
+            length += 1
+        return index_to_candidate(index - self._offsets[length], [self.charset] * length)
+
+    def lookup(self, hash_to_crack: str) -> Optional[str]:
+        """
+        Бинарный поиск digest в таблице, O(log n)
+        """
+        try:
+            target = bytes.fromhex(hash_to_crack)
+        except ValueError:
+            return None
+        if len(target) != DIGEST_SIZE:
+            return None
+
+        data = self._map
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            position = HEADER_SIZE + middle * RECORD_SIZE
+            if data[position:position + DIGEST_SIZE] < target:
+                low = middle + 1
+            else:
+                high = middle
+
+        position = HEADER_SIZE + low * RECORD_SIZE
+        if low < self.count and data[position:position + DIGEST_SIZE] == target:
+            index = struct.unpack_from(">I", data, position + DIGEST_SIZE)[0]
+            return self._candidate(index)
+        return None
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+_index = None
+
+
+def get_lookup_index(path: str = DEFAULT_INDEX_PATH) -> Optional[LookupIndex]:
+    """
+    Возвращает индекс, открытый один раз на процесс, или None, если файла нет
+    """
+    global _index
+    if _index is None or _index.path != path:
+        if not path or not os.path.exists(path):
+            return None
+        _index = LookupIndex(path)
+    return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Индекс MD5 для коротких паролей")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Построить индекс")
+    build_parser.add_argument("--output", default=DEFAULT_INDEX_PATH, help="Путь к файлу индекса")
+    build_parser.add_argument("--max-length", type=int, default=4, help="Максимальная длина пароля")
+    build_parser.add_argument("--charset", default=DEFAULT_CHARSET, help="Алфавит")
+
+    lookup_parser = subparsers.add_parser("lookup", help="Найти пароль по хешу")
+    lookup_parser.add_argument("hash", help="MD5 хеш")
+    lookup_parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Путь к файлу индекса")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        started = time.perf_counter()
+        count = build_index(args.output, args.charset, args.max_length)
+        print(f"Индекс {args.output}: {count} записей за {time.perf_counter() - started:.1f} сек")
+    else:
+        index = get_lookup_index(args.index)
+        if index is None:
+            print(f"Индекс {args.index} не найден")
+            return
+        started = time.perf_counter()
+        password = index.lookup(args.hash)
+        elapsed = (time.perf_counter() - started) * 1_000_000
+        print(f"{password if password is not None else 'не найден'} ({elapsed:.0f} мкс)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import time
+from typing import Optional
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}ч {minutes}м"
+    if minutes:
+        return f"{minutes}м {seconds}с"
+    return f"{seconds}с"
+
+
+class ProgressReporter:
+    """
+    Ограничивает частоту сообщений о прогрессе и считает метрики перебора.
+
+    Проверка due() — одно сравнение времени, поэтому ее можно вызывать
+    после каждой пачки кандидатов без заметных накладных расходов.
+    """
+
+    def __init__(self, total: int, max_rate: float, started_at: Optional[float] = None,
+                 resumed_attempts: int = 0):
+        self.total = total
+        self.interval = 1.0 / max_rate if max_rate > 0 else float("inf")
+        # Время старта общее для всех шардов задачи, поэтому используется time.time()
+        self.started_at = time.time() if started_at is None else started_at
+        # Попытки, сделанные до возобновления с контрольной точки, не входят в скорость
+        self.resumed_attempts = resumed_attempts
+        self.next_report = time.monotonic() + self.interval
+
+    def due(self) -> bool:
+        return time.monotonic() >= self.next_report
+
+    def mark(self):
+        self.next_report = time.monotonic() + self.interval
+
+    def snapshot(self, attempts: int, processed: Optional[int] = None) -> dict:
+        """
+        Структурированные поля сообщения о прогрессе.
+
+        processed — пройденная часть total, если total измеряется не в кандидатах
+        (например, байты словаря): тогда оставшиеся попытки оцениваются пропорционально.
+        """
+        elapsed = max(time.time() - self.started_at, 1e-6)
+        hashes_per_sec = max(attempts - self.resumed_attempts, 0) / elapsed
+        if processed is None:
+            processed = attempts
+            remaining = max(self.total - attempts, 0)
+        else:
+            processed = min(processed, self.total)
+            remaining = attempts * (self.total - processed) / processed if processed else 0
+        return {
+            "attempts": attempts,
+            "total": self.total,
+            "hashes_per_sec": round(hashes_per_sec),
+            "percent": round(processed / self.total * 100, 2) if self.total else 100.0,
+            "eta_seconds": round(remaining / hashes_per_sec, 1) if hashes_per_sec else None,
+        }
+
+    @staticmethod
+    def describe(fields: dict) -> str:
+        return (
+            f"⚡️ Проверено {fields['attempts']} паролей ({fields['percent']}%), "
+            f"{fields['hashes_per_sec']} хешей/сек, "
+            f"осталось ~{format_duration(fields['eta_seconds'])}"
+        )
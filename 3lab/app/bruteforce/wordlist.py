@@ -0,0 +1,219 @@
+import mmap
+import os
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.bruteforce.algorithms import HashAlgorithm
+from app.bruteforce.engine import DEFAULT_BATCH_SIZE
+
+DEFAULT_WORDLIST_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "wordlists"
+)
+
+# Правила изменения слов. Каждое правило превращает слово в список кандидатов;
+# правила объединяются в цепочку через "+": "capitalize+append_digit"
+RULES: Dict[str, Callable[[bytes], List[bytes]]] = {
+    "lower": lambda word: [word.lower()],
+    "upper": lambda word: [word.upper()],
+    "capitalize": lambda word: [word.capitalize()],
+    "toggle_case": lambda word: [word.swapcase()],
+    "reverse": lambda word: [word[::-1]],
+}
+# Правила-окончания: если цепочка заканчивается таким правилом, состояние хеша
+# слова считается один раз и копируется для каждого окончания
+APPENDS: Dict[str, List[bytes]] = {
+    "append_digit": [b"%d" % digit for digit in range(10)],
+    "append_two_digits": [b"%02d" % number for number in range(100)],
+    "append_year": [b"%d" % year for year in range(1950, 2031)],
+}
+for _name, _suffixes in APPENDS.items():
+    RULES[_name] = lambda word, suffixes=_suffixes: [word + suffix for suffix in suffixes]
+
+
+# Средняя длина строки словаря (с переводом строки) для оценки стоимости перебора
+AVERAGE_LINE_SIZE = 9
+
+
+class WordlistBatch(NamedTuple):
+    """
+    Результат проверки пачки слов словаря. offset — начало первой
+    непроверенной строки: с него перебор продолжается после перезапуска.
+    """
+    checked: int
+    found: Dict[str, str]
+    current: str
+    offset: int
+
+
+def parse_rules(rules: Iterable[str]) -> List[List[str]]:
+    """
+    Разбирает цепочки правил ("capitalize+append_digit") и проверяет имена
+    """
+    chains = []
+    for rule in rules:
+        chain = [name.strip() for name in rule.split("+")]
+        for name in chain:
+            if name not in RULES:
+                raise ValueError(f"Неизвестное правило: {name}")
+        chains.append(chain)
+    return chains
+
+
+def apply_chain(word: bytes, chain: List[str]) -> List[bytes]:
+    candidates = [word]
+    for name in chain:
+        candidates = [result for candidate in candidates for result in RULES[name](candidate)]
+    return candidates
+
+
+def resolve_wordlist(name: str, directory: str) -> str:
+    """
+    Путь к словарю внутри каталога словарей. Выход за пределы каталога запрещен.
+    """
+    directory = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(directory, name))
+    if os.path.commonpath([directory, path]) != directory or not os.path.isfile(path):
+        raise FileNotFoundError(f"Словарь не найден: {name}")
+    return path
+
+
+class Wordlist:
+    """
+    Словарь на диске и правила изменения слов.
+
+    Файл не загружается в память: строки читаются через mmap, а для
+    распределения по воркерам файл делится на диапазоны байтов. Строка
+    принадлежит диапазону [start, stop), если в нем находится ее первый байт.
+    """
+
+    def __init__(self, name: str, directory: str = DEFAULT_WORDLIST_DIR, rules: Iterable[str] = ()):
+        self.name = name
+        self.rules = list(rules)
+        # Слово без изменений, затем цепочки; окончание цепочки выделяется отдельно
+        self.plans = [([], None)]
+        for chain in parse_rules(self.rules):
+            if chain[-1] in APPENDS:
+                self.plans.append((chain[:-1], chain[-1]))
+            else:
+                self.plans.append((chain, None))
+        self.path = resolve_wordlist(name, directory)
+
+    @classmethod
+    def from_dict(cls, data: Dict, directory: str = DEFAULT_WORDLIST_DIR) -> "Wordlist":
+        return cls(data["name"], directory, data.get("rules", ()))
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "rules": self.rules}
+
+    def identity(self) -> str:
+        """
+        Строка для ключей кэша: измененный файл словаря — другой перебор
+        """
+        stat = os.stat(self.path)
+        return f"wordlist:{self.name}:{stat.st_size}:{stat.st_mtime_ns}:{'|'.join(self.rules)}"
+
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def estimated_candidates(self) -> int:
+        """
+        Оценка числа кандидатов без чтения файла: строки по средней длине слова
+        """
+        per_word = sum(len(APPENDS[append]) if append else 1 for _, append in self.plans)
+        return self.size() // AVERAGE_LINE_SIZE * per_word
+
+    def split(self, chunk_size: int) -> List[Dict]:
+        """
+        Делит файл на диапазоны байтов примерно по chunk_size
+        """
+        size = self.size()
+        return [
+            {"start": start, "stop": min(start + chunk_size, size)}
+            for start in range(0, size, max(chunk_size, 1))
+        ]
+
+    def iter_lines(self, shard: Dict) -> Iterator[Tuple[int, bytes]]:
+        """
+        Перебирает строки диапазона: (смещение следующей строки, слово)
+        """
+        if shard["start"] >= shard["stop"]:
+            return
+        with open(self.path, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if hasattr(data, "madvise"):
+                    data.madvise(mmap.MADV_SEQUENTIAL)
+                size = len(data)
+                position = shard["start"]
+                # Неполная строка в начале диапазона принадлежит предыдущему диапазону
+                if position > 0 and data[position - 1] != ord("\n"):
+                    position = data.find(b"\n", position)
+                    position = size if position == -1 else position + 1
+                while position < shard["stop"]:
+                    end = data.find(b"\n", position)
+                    if end == -1:
+                        end = size
+                    word = data[position:end].rstrip(b"\r")
+                    position = end + 1
+                    if word:
+                        yield position, word
+
+    def search_many(self, hashes: Iterable[str], shard: Dict, batch_size: int = DEFAULT_BATCH_SIZE,
+                    algorithm: Optional[HashAlgorithm] = None) -> Iterator[WordlistBatch]:
+        """
+        Проверяет слова диапазона и результаты правил против набора хешей.
+        Одинаковые кандидаты от разных правил для одного слова проверяются один раз.
+        """
+        algorithm = algorithm or HashAlgorithm()
+        targets = {bytes.fromhex(hash_value): hash_value.lower() for hash_value in hashes}
+        digest = algorithm.digest
+        # Соль-окончание дописывается к каждому окончанию правила
+        appends = {name: [suffix + algorithm.suffix for suffix in suffixes] for name, suffixes in APPENDS.items()}
+        checked = 0
+        current = b""
+        offset = shard["start"]
+
+        for next_offset, word in self.iter_lines(shard):
+            current = word
+            seen = set()
+            for chain, append in self.plans:
+                for base in apply_chain(word, chain):
+                    if (base, append) in seen:
+                        continue
+                    seen.add((base, append))
+                    if append is None:
+                        checked += 1
+                        found = [base] if digest(base) in targets else []
+                    else:
+                        copy = algorithm.new(base).copy
+                        suffixes = appends[append]
+                        found = []
+                        for suffix in suffixes:
+                            state = copy()
+                            state.update(suffix)
+                            if state.digest() in targets:
+                                found.append(base + APPENDS[append][suffixes.index(suffix)])
+                        checked += len(APPENDS[append])
+
+                    for candidate in found:
+                        # Тот же кандидат мог получиться и другой цепочкой правил
+                        hash_value = targets.pop(digest(candidate), None)
+                        if hash_value is None:
+                            continue
+                        password = candidate.decode("utf-8", "replace")
+                        # Слово проверено не до конца: продолжать нужно с его строки
+                        yield WordlistBatch(checked, {hash_value: password}, password, offset)
+                        checked = 0
+                        if not targets:
+                            return
+            offset = next_offset
+            if checked >= batch_size:
+                yield WordlistBatch(checked, {}, current.decode("utf-8", "replace"), offset)
+                checked = 0
+
+        if checked:
+            yield WordlistBatch(checked, {}, current.decode("utf-8", "replace"), offset)
+
+    def search(self, hash_to_crack: str, shard: Dict, batch_size: int = DEFAULT_BATCH_SIZE,
+               algorithm: Optional[HashAlgorithm] = None) -> Iterator[WordlistBatch]:
+        for batch in self.search_many([hash_to_crack], shard, batch_size, algorithm):
+            yield batch
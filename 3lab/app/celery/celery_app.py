@@ -1,13 +1,51 @@
+import logging
+import time
+
 from celery import Celery
-from app.core.redislite_init import redis_socket
+from celery.signals import before_task_publish, task_prerun, task_postrun, worker_ready
+from kombu import Queue
+from app.core.config import settings
+from app.core.redis_client import get_celery_url
+
+logger = logging.getLogger(__name__)
+
+# Момент импорта приложения: от него считается холодный старт воркера
+STARTED_AT = time.perf_counter()
+
+# Очереди по стоимости задачи: дешевые задачи не ждут за дорогими.
+# Отдельный воркер для дешевых задач: celery -A app.celery.celery_app worker -Q bruteforce.small
+SMALL_JOBS_QUEUE = "bruteforce.small"
+LARGE_JOBS_QUEUE = "bruteforce.large"
 
 # Создаем Celery приложение
 celery_app = Celery(
     'app',
-    broker=f"redis+socket://{redis_socket}",
-    backend=f"redis+socket://{redis_socket}",
     include=['app.celery.tasks']  # Важно: включаем модуль с задачами
 )
+# Текущее приложение Celery хранится для каждого потока отдельно: без этого shared_task,
+# вызванные из пула потоков FastAPI, отправлялись бы через пустое приложение с брокером amqp
+celery_app.set_default()
+
+
+class RedisConfig:
+    """
+    Адреса брокера и бэкенда результатов. Celery читает их при первом обращении
+    к конфигурации, поэтому встроенный redislite не запускается при импорте модуля.
+    Ошибка запуска redislite доходит до вызывающего кода: обработчики сигналов
+    Celery только записывают исключения в лог, и брокером остался бы amqp по умолчанию.
+    """
+
+    @property
+    def broker_url(self) -> str:
+        return settings.CELERY_BROKER_URL or get_celery_url()
+
+    @property
+    def result_backend(self) -> str:
+        return settings.CELERY_RESULT_BACKEND or get_celery_url()
+
+
+celery_app.config_from_object(RedisConfig())
+
 
 # Конфигурация Celery
 celery_app.conf.update(
@@ -18,9 +56,43 @@ celery_app.conf.update(
     enable_utc=True,
     task_track_started=True,
     task_time_limit=3600,  # 1 час максимум на задачу
+    task_soft_time_limit=3540,  # Мягкий лимит: задача сохраняет позицию и перезапускается
+    task_acks_late=True,  # Подтверждать задачу после выполнения, чтобы не терять ее при падении воркера
+    task_reject_on_worker_lost=True,
+    # Через сколько секунд неподтвержденная задача упавшего воркера вернется в очередь
+    broker_transport_options={'visibility_timeout': settings.BROKER_VISIBILITY_TIMEOUT},
+    # Воркер без -Q слушает все очереди
+    task_queues=(Queue('celery'), Queue(SMALL_JOBS_QUEUE), Queue(LARGE_JOBS_QUEUE)),
+    task_default_queue='celery',
     worker_prefetch_multiplier=1,  # Брать по одной задаче
-    worker_max_tasks_per_child=1  # Перезапускать воркер после каждой задачи
+    # Перезапуск процесса после N задач стоит fork и новых соединений с Redis
+    worker_max_tasks_per_child=settings.WORKER_MAX_TASKS_PER_CHILD or None
 )
 
+
+@worker_ready.connect
+def log_startup_time(**kwargs):
+    logger.info(f"Воркер готов через {time.perf_counter() - STARTED_AT:.2f} с после запуска")
+
+
+@before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    headers["published_at"] = time.time()
+
+
+@task_prerun.connect
+def log_queue_wait(task=None, **kwargs):
+    task.request.started_at = time.perf_counter()
+    published_at = getattr(task.request, "published_at", None)
+    if published_at:
+        logger.info(f"Задача {task.name} ждала в очереди {time.time() - published_at:.3f} с")
+
+
+@task_postrun.connect
+def log_task_duration(task=None, **kwargs):
+    started_at = getattr(task.request, "started_at", None)
+    if started_at:
+        logger.info(f"Задача {task.name} выполнялась {time.perf_counter() - started_at:.3f} с")
+
 # Экспортируем для использования в других модулях
 __all__ = ['celery_app'] 
\ No newline at end of file
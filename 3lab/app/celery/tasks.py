@@ -1,12 +1,20 @@
 import time
-import itertools
-import string
-import hashlib
 import json
+import uuid
 from typing import Optional
 from celery import shared_task
-from app.core.redislite_init import redis_instance
-from app.celery.celery_app import celery_app
+from celery.exceptions import MaxRetriesExceededError, SoftTimeLimitExceeded
+from app.core import metrics
+from app.core.redis_client import get_redis
+from app.celery.celery_app import celery_app, SMALL_JOBS_QUEUE, LARGE_JOBS_QUEUE
+from app.bruteforce import cache, jobs
+from app.bruteforce.checkpoint import Checkpointer, checkpoint_key, clear_checkpoints
+from app.bruteforce.algorithms import HashAlgorithm
+from app.bruteforce.engine import get_engine
+from app.bruteforce.keyspace import Keyspace
+from app.bruteforce.progress import ProgressReporter
+from app.bruteforce.wordlist import Wordlist
+from app.core.config import settings
 import logging
 
 # Настройка логирования
@@ -14,76 +22,631 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 NOTIFICATION_CHANNEL = "ws_notifications"
+# Типы сообщений, после которых задача клиента завершена
+FINAL_MESSAGE_TYPES = ("success", "not_found", "error", "done", "cancelled")
+# Состояние задачи для /status по типу опубликованного сообщения
+STATUS_BY_MESSAGE = {
+    "start": "running",
+    "success": "cracked",
+    "not_found": "not_found",
+    "error": "error",
+    "done": "done",
+}
+# Как часто (в кандидатах) шард проверяет, не найден ли пароль другим шардом
+SHARD_CHECK_INTERVAL = 100000
+# Сколько секунд хранить сообщения для еще не подключившегося клиента
+PENDING_TTL = 60
+# Ошибка задачи, которая не уложилась в лимит времени за все повторы
+TIME_LIMIT_MESSAGE = "⚠️ Перебор не уложился в лимит времени, продолжить можно через /resume"
+PROGRESS_LOG_LEVEL = logging.getLevelName(settings.PROGRESS_LOG_LEVEL.upper())
 
-@shared_task(name='app.celery.tasks.bruteforce_task')
-def bruteforce_task(hash_to_crack: str, client_id: str):
+
+def client_channel(client_id: str) -> str:
+    """
+    У каждого клиента свой канал: API не разбирает чужие сообщения
+    """
+    return f"{NOTIFICATION_CHANNEL}:{client_id}"
+
+
+def pending_key(client_id: str) -> str:
+    return f"bruteforce:client:{client_id}:pending"
+
+
+def publish_message(client_id: str, message: str, msg_type: str, remember: bool = False, **fields):
     """
-    Задача для брутфорса MD5 хеша
+    Публикует сообщение в канал уведомлений клиента.
+
+    remember=True дополнительно сохраняет сообщение на PENDING_TTL секунд:
+    ответы из кэша и индекса публикуются раньше, чем клиент успевает открыть
+    WebSocket, и доставляются ему при подключении. Доставленное подключенному
+    клиенту сообщение диспетчер из сохраненных удаляет.
+    """
+    payload = {
+        "client_id": client_id,
+        "message": message,
+        "type": msg_type,
+        **fields
+    }
+    if settings.METRICS_ENABLED:
+        # По этой отметке API считает задержку доставки до WebSocket
+        payload["published_at"] = time.time()
+    data = json.dumps(payload)
+    if remember:
+        # Сохраняется до публикации: диспетчер, доставивший сообщение, убирает его из отложенных
+        pipe = get_redis().pipeline()
+        pipe.rpush(pending_key(client_id), data)
+        pipe.expire(pending_key(client_id), PENDING_TTL)
+        pipe.execute()
+    get_redis().publish(client_channel(client_id), data)
+    return payload
+
+
+def publish_job_message(job_id: str, client_id: str, message: str, msg_type: str, **fields):
+    """
+    Публикует сообщение задачи владельцу и всем присоединившимся клиентам
+    и обновляет состояние задачи для /status. Итоговые сообщения сохраняются
+    для клиентов, которые еще не открыли WebSocket: маленькая задача на
+    прогретом пуле успевает завершиться раньше.
+    """
+    jobs.update_status(
+        job_id,
+        STATUS_BY_MESSAGE.get(msg_type),
+        attempts=fields.get("attempts"),
+        result=fields.get("password") if msg_type == "success" else None
+    )
+    if msg_type == "progress":
+        metrics.report_job(job_id, fields)
+    elif msg_type in FINAL_MESSAGE_TYPES:
+        metrics.report_finished(job_id, STATUS_BY_MESSAGE.get(msg_type, msg_type))
+    for recipient in jobs.get_clients(job_id, client_id):
+        publish_message(
+            recipient, message, msg_type, remember=msg_type in FINAL_MESSAGE_TYPES, job_id=job_id, **fields
+        )
+
+
+def queue_for_cost(cost: int) -> str:
+    """
+    Очередь по оценке стоимости задачи: дешевые задачи не ждут за дорогими
+    """
+    return SMALL_JOBS_QUEUE if cost <= settings.SMALL_JOB_MAX_COST else LARGE_JOBS_QUEUE
+
+
+def finish_job(key: str, password: Optional[str]):
+    """
+    Запоминает результат в кэше и снимает отметку о выполняющемся переборе.
+    Результат сохраняется до публикации итогового сообщения, чтобы клиент,
+    присоединившийся в последний момент, нашел его в кэше.
+    """
+    cache.store_result(key, password, settings.RESULT_CACHE_TTL, settings.RESULT_CACHE_MAX_SIZE)
+    cache.release_inflight(key)
+    clear_checkpoints(key)
+
+
+def progress_fields(reporter: ProgressReporter, attempts: int, current: str,
+                    processed: Optional[int] = None) -> dict:
+    """
+    Сообщение о прогрессе: текст для клиента и структурированные поля
+    """
+    fields = reporter.snapshot(attempts, processed)
+    fields["current"] = current
+    fields["message"] = f"{reporter.describe(fields)}. Текущий: {current}"
+    # Подробные логи горячего цикла включаются настройкой PROGRESS_LOG_LEVEL
+    logger.log(PROGRESS_LOG_LEVEL, fields["message"])
+    return fields
+
+
+def multi_summary(cracked: dict, remaining: set, answered: Optional[dict] = None) -> dict:
     """
+    Итог задачи нескольких хешей вместе с хешами, на которые ответили кэш и индекс
+    до запуска перебора
+    """
+    answered = answered or {}
+    cracked = {**answered.get("cracked", {}), **cracked}
+    not_found = sorted(set(remaining) | set(answered.get("not_found", [])))
+    return {"cracked": cracked, "not_found": not_found}
+
+
+def make_checkpointer(key: str, shard: Optional[dict] = None) -> Checkpointer:
+    return Checkpointer(
+        checkpoint_key(key, shard),
+        settings.CHECKPOINT_INTERVAL,
+        settings.RESULT_CACHE_TTL
+    )
+
+@shared_task(bind=True, name='app.celery.tasks.bruteforce_task',
+             acks_late=True, reject_on_worker_lost=True)
+def bruteforce_task(self, hash_to_crack: str, client_id: str, keyspace: Optional[dict] = None,
+                    algorithm: Optional[dict] = None, job_id: Optional[str] = None):
+    """
+    Задача для брутфорса хеша.
+
+    keyspace — словарь Keyspace.to_dict(): алфавит и диапазон длин либо маска,
+    algorithm — словарь HashAlgorithm.to_dict() (по умолчанию MD5 без соли),
+    job_id — id задачи API (по умолчанию id задачи Celery).
+
+    Позиция перебора периодически сохраняется в Redis: после перезапуска
+    воркера, повтора по таймауту или повторной отправки того же хеша
+    перебор продолжается с последней контрольной точки.
+    """
+    job_id = job_id or self.request.id
+    keyspace = Keyspace.from_dict(keyspace)
+    algorithm = HashAlgorithm.from_dict(algorithm)
+    key = cache.result_key(algorithm.identity(), hash_to_crack, keyspace)
+    checkpointer = make_checkpointer(key)
+    state = checkpointer.load()
+
     try:
-        logger.info(f"Начало брутфорса для хеша {hash_to_crack} (клиент: {client_id})")
-        
-        # Используем и строчные и прописные буквы
-        characters = string.ascii_letters + string.digits
-        max_length = 5  # Максимальная длина пароля
-        
-        # Публикуем начало работы
-        start_message = {
-            "client_id": client_id,
-            "message": "🔍 Начинаю брутфорс...",
-            "type": "start"
-        }
-        logger.info(f"Отправка сообщения в Redis: {start_message}")
-        redis_instance.publish(NOTIFICATION_CHANNEL, json.dumps(start_message))
+        if jobs.stop_reason(job_id, self.request.id):
+            logger.info(f"Задача {job_id} отменена или перезапущена до начала перебора")
+            return None
 
-        total_attempts = 0
-        for length in range(1, max_length + 1):
+        if state is None:
+            logger.info(f"Начало брутфорса для хеша {hash_to_crack} (клиент: {client_id})")
+            # Публикуем начало работы
+            publish_job_message(job_id, client_id, "🔍 Начинаю брутфорс...", "start")
+            state = {"length": keyspace.min_length, "position": 0, "attempts": 0}
+        else:
+            logger.info(f"Продолжение брутфорса для хеша {hash_to_crack} с контрольной точки {state}")
+            publish_job_message(
+                job_id,
+                client_id,
+                f"♻️ Продолжаю брутфорс с длины {state['length']} "
+                f"(уже проверено {state['attempts']} паролей)...",
+                "start"
+            )
+
+        engine = get_engine(settings.BRUTEFORCE_ENGINE, keyspace, algorithm=algorithm)
+        reporter = ProgressReporter(
+            keyspace.size(),
+            settings.PROGRESS_MAX_RATE,
+            resumed_attempts=state["attempts"]
+        )
+        for length in range(state["length"], keyspace.max_length + 1):
             logger.info(f"Перебор паролей длины {length}")
-            for guess in itertools.product(characters, repeat=length):
-                password = ''.join(guess)
-                guess_hash = hashlib.md5(password.encode()).hexdigest()
-                
-                total_attempts += 1
-                if total_attempts % 1000 == 0:  # Отправляем статус каждые 1000 попыток
-                    progress_message = {
-                        "client_id": client_id,
-                        "message": f"⚡️ Проверено {total_attempts} паролей. Текущий: {password}",
-                        "type": "progress"
-                    }
-                    logger.info(f"Отправка прогресса в Redis: {progress_message}")
-                    redis_instance.publish(NOTIFICATION_CHANNEL, json.dumps(progress_message))
-                
-                if guess_hash == hash_to_crack:
-                    # Найден правильный пароль
-                    result = f"✅ Пароль найден: {password} (после {total_attempts} попыток)"
-                    success_message = {
-                        "client_id": client_id,
-                        "message": result,
-                        "type": "success"
-                    }
-                    logger.info(f"Отправка результата в Redis: {success_message}")
-                    redis_instance.publish(NOTIFICATION_CHANNEL, json.dumps(success_message))
-                    return password
+            shard = keyspace.full_shard(length)
+            position = state["position"] if length == state["length"] else 0
+            state["position"], shards = keyspace.resume_shards(shard, position)
+            state["length"] = length
+
+            for sub_shard in shards:
+                for batch in engine.search(hash_to_crack, sub_shard):
+                    state["position"] += batch.checked
+                    state["attempts"] += batch.checked
+                    total_attempts = state["attempts"]
+
+                    if batch.found is not None:
+                        # Найден правильный пароль
+                        password = batch.found
+                        logger.info(f"Пароль для хеша {hash_to_crack} найден после {total_attempts} попыток")
+                        finish_job(key, password)
+                        publish_job_message(
+                            job_id,
+                            client_id,
+                            f"✅ Пароль найден: {password} (после {total_attempts} попыток)",
+                            "success",
+                            password=password,
+                            attempts=total_attempts
+                        )
+                        return password
+
+                    # Задача отменена: позиция сохраняется, чтобы ее можно было возобновить.
+                    # Перезапущенная задача продолжает с контрольной точки сама
+                    stop = jobs.stop_reason(job_id, self.request.id)
+                    if stop == "finished":
+                        checkpointer.save(state)
+                        logger.info(f"Задача {job_id} отменена на позиции {state}")
+                        return None
+                    if stop == "restarted":
+                        logger.info(f"Задача {job_id} перезапущена, прежний запуск остановлен")
+                        return None
+
+                    if checkpointer.maybe_save(state):
+                        cache.touch_inflight(key, settings.INFLIGHT_TTL)
+
+                    # Статус отправляется не чаще PROGRESS_MAX_RATE раз в секунду
+                    if reporter.due():
+                        reporter.mark()
+                        fields = progress_fields(reporter, total_attempts, batch.current)
+                        publish_job_message(job_id, client_id, fields.pop("message"), "progress", **fields)
         
         # Пароль не найден
-        not_found_message = {
-            "client_id": client_id,
-            "message": f"❌ Пароль не найден после {total_attempts} попыток",
-            "type": "not_found"
-        }
-        logger.info(f"Отправка сообщения о неудаче в Redis: {not_found_message}")
-        redis_instance.publish(NOTIFICATION_CHANNEL, json.dumps(not_found_message))
+        total_attempts = state["attempts"]
+        logger.info(f"Пароль для хеша {hash_to_crack} не найден после {total_attempts} попыток")
+        finish_job(key, None)
+        publish_job_message(
+            job_id,
+            client_id,
+            f"❌ Пароль не найден после {total_attempts} попыток",
+            "not_found",
+            attempts=total_attempts
+        )
         return None
+
+    except SoftTimeLimitExceeded:
+        # Сохраняем позицию и перезапускаем задачу: она продолжит с этого места
+        checkpointer.save(state)
+        cache.touch_inflight(key, settings.INFLIGHT_TTL)
+        logger.warning(f"Лимит времени задачи {job_id} исчерпан, повтор с позиции {state}")
+        try:
+            raise self.retry(countdown=1, max_retries=settings.CHECKPOINT_MAX_RETRIES)
+        except MaxRetriesExceededError:
+            # Повторы кончились: позиция остается в контрольной точке для /resume
+            logger.error(f"Задача {job_id} не уложилась в {settings.CHECKPOINT_MAX_RETRIES} повторов")
+            cache.release_inflight(key)
+            publish_job_message(job_id, client_id, TIME_LIMIT_MESSAGE, "error")
+            raise
         
     except Exception as e:
         logger.error(f"Ошибка в процессе брутфорса: {e}")
+        cache.release_inflight(key)
         # В случае ошибки отправляем сообщение об ошибке
-        error_message = {
-            "client_id": client_id,
-            "message": f"⚠️ Произошла ошибка: {str(e)}",
-            "type": "error"
-        }
-        redis_instance.publish(NOTIFICATION_CHANNEL, json.dumps(error_message))
+        publish_job_message(job_id, client_id, f"⚠️ Произошла ошибка: {str(e)}", "error")
+        raise
+
+
+@shared_task(bind=True, name='app.celery.tasks.multi_bruteforce_task')
+def multi_bruteforce_task(self, hashes: list, client_id: str, keyspace: Optional[dict] = None,
+                          algorithm: Optional[dict] = None, answered: Optional[dict] = None):
+    """
+    Брутфорс сразу нескольких хешей одного алгоритма за один проход по пространству паролей.
+    answered — {"cracked", "not_found"} хешей запроса, на которые уже ответил кэш или индекс:
+    они попадают в итоговое сообщение.
+    """
+    job_id = self.request.id
+    keyspace = Keyspace.from_dict(keyspace)
+    algorithm = HashAlgorithm.from_dict(algorithm)
+    try:
+        remaining = {hash_value.lower() for hash_value in hashes}
+        logger.info(f"Начало брутфорса {len(remaining)} хешей (клиент: {client_id})")
+        if jobs.is_finished(job_id):
+            return None
+        publish_job_message(job_id, client_id, f"🔍 Начинаю брутфорс {len(remaining)} хешей...", "start")
+
+        engine = get_engine(settings.BRUTEFORCE_ENGINE, keyspace, algorithm=algorithm)
+        reporter = ProgressReporter(keyspace.size(), settings.PROGRESS_MAX_RATE)
+        cracked = {}
+        total_attempts = 0
+        for length in keyspace.lengths():
+            shard = keyspace.full_shard(length)
+            for batch in engine.search_many(remaining, shard):
+                total_attempts += batch.checked
+
+                # Каждый найденный пароль отправляем клиенту сразу
+                for hash_value, password in batch.found.items():
+                    remaining.discard(hash_value)
+                    cracked[hash_value] = password
+                    cache.store_result(
+                        cache.result_key(algorithm.identity(), hash_value, keyspace),
+                        password,
+                        settings.RESULT_CACHE_TTL,
+                        settings.RESULT_CACHE_MAX_SIZE
+                    )
+                    publish_job_message(
+                        job_id,
+                        client_id,
+                        f"✅ {hash_value}: {password} (после {total_attempts} попыток)",
+                        "found",
+                        hash=hash_value,
+                        password=password
+                    )
+
+                if jobs.is_finished(job_id):
+                    logger.info(f"Задача {job_id} отменена")
+                    return cracked
+                if reporter.due():
+                    reporter.mark()
+                    fields = progress_fields(reporter, total_attempts, batch.current)
+                    publish_job_message(
+                        job_id,
+                        client_id,
+                        f"{fields.pop('message')}, найдено {len(cracked)} из {len(hashes)}",
+                        "progress",
+                        cracked_count=len(cracked),
+                        **fields
+                    )
+            if not remaining:
+                break
+
+        for hash_value in remaining:
+            cache.store_result(
+                cache.result_key(algorithm.identity(), hash_value, keyspace),
+                None,
+                settings.RESULT_CACHE_TTL,
+                settings.RESULT_CACHE_MAX_SIZE
+            )
+        summary = multi_summary(cracked, remaining, answered)
+        publish_job_message(
+            job_id,
+            client_id,
+            f"🏁 Найдено {len(summary['cracked'])} из "
+            f"{len(summary['cracked']) + len(summary['not_found'])} паролей после {total_attempts} попыток",
+            "done",
+            attempts=total_attempts,
+            **summary
+        )
+        return cracked
+
+    except Exception as e:
+        logger.error(f"Ошибка в процессе брутфорса нескольких хешей: {e}")
+        publish_job_message(job_id, client_id, f"⚠️ Произошла ошибка: {str(e)}", "error")
         raise
 
-# ... (остальной код файла без изменений) ... 
\ No newline at end of file
+
+def start_sharded_job(hash_to_crack: str, client_id: str, shard_size: int,
+                      keyspace: Optional[dict] = None, job_id: Optional[str] = None,
+                      algorithm: Optional[dict] = None, queue: Optional[str] = None,
+                      run_id: Optional[str] = None) -> str:
+    """
+    Ставит в очередь раздачу шардов. Шардов может быть до BRUTEFORCE_MAX_SHARDS,
+    поэтому они отправляются из задачи Celery, а не из обработчика запроса.
+    """
+    job_id = job_id or str(uuid.uuid4())
+    run_id = run_id or jobs.start_run(job_id)
+    # Задача раздачи получает id запуска: /cancel отзывает ее, если она еще не началась
+    dispatch_shards_task.apply_async(
+        args=(hash_to_crack, client_id, job_id, shard_size, keyspace, algorithm, queue, run_id),
+        task_id=run_id,
+        queue=queue
+    )
+    return job_id
+
+
+@shared_task(name='app.celery.tasks.dispatch_shards_task')
+def dispatch_shards_task(hash_to_crack: str, client_id: str, job_id: str, shard_size: int,
+                         keyspace: Optional[dict] = None, algorithm: Optional[dict] = None,
+                         queue: Optional[str] = None, run_id: Optional[str] = None):
+    """
+    Делит пространство перебора на шарды и ставит их в очередь параллельно
+    """
+    space = Keyspace.from_dict(keyspace)
+    shard_size = space.fit_shard_size(shard_size, settings.BRUTEFORCE_MAX_SHARDS)
+    task_ids = [str(uuid.uuid4()) for _ in range(space.count_shards(shard_size))]
+
+    # Идентификаторы сохраняем до отправки, чтобы их можно было отозвать
+    jobs.register_shards(job_id, task_ids)
+    publish_job_message(
+        job_id,
+        client_id,
+        f"🔍 Начинаю шардированный брутфорс ({len(task_ids)} шардов)...",
+        "start"
+    )
+
+    for task_id, shard in zip(task_ids, space.split(shard_size)):
+        # Пароль уже найден, задача отменена или перезапущена: остальные шарды не нужны
+        if jobs.stop_reason(job_id, run_id):
+            logger.info(f"Раздача шардов задачи {job_id} остановлена")
+            return
+        bruteforce_shard_task.apply_async(
+            args=(hash_to_crack, client_id, job_id, shard, keyspace, algorithm, run_id),
+            task_id=task_id,
+            queue=queue
+        )
+    logger.info(f"Задача {job_id} разбита на {len(task_ids)} шардов")
+
+
+@shared_task(bind=True, name='app.celery.tasks.bruteforce_shard_task',
+             acks_late=True, reject_on_worker_lost=True)
+def bruteforce_shard_task(self, hash_to_crack: str, client_id: str, job_id: str, shard: dict,
+                          keyspace: Optional[dict] = None, algorithm: Optional[dict] = None,
+                          run_id: Optional[str] = None):
+    """
+    Перебор одного шарда пространства паролей с контрольными точками.
+    run_id — запуск задачи: шард прошлого запуска останавливается после /resume.
+    """
+    keyspace = Keyspace.from_dict(keyspace)
+    algorithm = HashAlgorithm.from_dict(algorithm)
+    key = cache.result_key(algorithm.identity(), hash_to_crack, keyspace)
+    checkpointer = make_checkpointer(key, shard)
+    state = checkpointer.load() or {"position": 0}
+    try:
+        if jobs.stop_reason(job_id, run_id):
+            logger.info(f"Шард {shard} задачи {job_id} пропущен: задача завершена или перезапущена")
+            return None
+
+        engine = get_engine(settings.BRUTEFORCE_ENGINE, keyspace, SHARD_CHECK_INTERVAL, algorithm)
+        started_at, resumed_attempts = jobs.get_timing(job_id)
+        reporter = ProgressReporter(
+            keyspace.size(),
+            settings.PROGRESS_MAX_RATE,
+            started_at=started_at,
+            resumed_attempts=resumed_attempts
+        )
+        state["position"], shards = keyspace.resume_shards(shard, state["position"])
+        total_attempts = 0
+        for sub_shard in shards:
+            for batch in engine.search(hash_to_crack, sub_shard):
+                state["position"] += batch.checked
+                total_attempts = jobs.add_attempts(job_id, batch.checked)
+
+                if batch.found is not None:
+                    password = batch.found
+                    if jobs.mark_finished(job_id, password):
+                        finish_job(key, password)
+                        publish_job_message(
+                            job_id,
+                            client_id,
+                            f"✅ Пароль найден: {password} (после ~{total_attempts} попыток)",
+                            "success",
+                            password=password,
+                            attempts=total_attempts
+                        )
+                        # Отзываем шарды, которые еще не начали выполняться
+                        celery_app.control.revoke(jobs.get_shard_ids(job_id))
+                    return password
+
+                # Пароль найден другим шардом или задача перезапущена — останавливаемся досрочно
+                if jobs.stop_reason(job_id, run_id):
+                    return None
+                if checkpointer.maybe_save(state):
+                    cache.touch_inflight(key, settings.INFLIGHT_TTL)
+                # Лимит частоты общий для всех шардов задачи
+                if reporter.due():
+                    reporter.mark()
+                    if jobs.claim_progress_slot(job_id, reporter.interval):
+                        fields = progress_fields(reporter, total_attempts, batch.current)
+                        publish_job_message(job_id, client_id, fields.pop("message"), "progress", **fields)
+
+        # Шард пройден целиком: при возобновлении задачи он будет пропущен
+        checkpointer.save(state)
+        if jobs.finish_shard(job_id) and jobs.mark_finished(job_id, ""):
+            # Последний шард: попытки остальных шардов уже учтены в общем счетчике
+            total_attempts = jobs.get_attempts(job_id)
+            finish_job(key, None)
+            publish_job_message(
+                job_id,
+                client_id,
+                f"❌ Пароль не найден после {total_attempts} попыток",
+                "not_found",
+                attempts=total_attempts
+            )
+        return None
+
+    except SoftTimeLimitExceeded:
+        checkpointer.save(state)
+        cache.touch_inflight(key, settings.INFLIGHT_TTL)
+        logger.warning(f"Лимит времени шарда {shard} задачи {job_id} исчерпан, повтор")
+        try:
+            raise self.retry(countdown=1, max_retries=settings.CHECKPOINT_MAX_RETRIES)
+        except MaxRetriesExceededError:
+            logger.error(f"Шард {shard} задачи {job_id} не уложился в {settings.CHECKPOINT_MAX_RETRIES} повторов")
+            if jobs.mark_finished(job_id, ""):
+                cache.release_inflight(key)
+                publish_job_message(job_id, client_id, TIME_LIMIT_MESSAGE, "error")
+            raise
+
+    except Exception as e:
+        logger.error(f"Ошибка в шарде {shard} задачи {job_id}: {e}")
+        if jobs.mark_finished(job_id, ""):
+            cache.release_inflight(key)
+            publish_job_message(job_id, client_id, f"⚠️ Произошла ошибка: {str(e)}", "error")
+        raise
+
+
+def start_wordlist_job(hash_to_crack: str, client_id: str, wordlist: dict,
+                       chunk_size: int, job_id: Optional[str] = None,
+                       algorithm: Optional[dict] = None, queue: Optional[str] = None,
+                       run_id: Optional[str] = None) -> str:
+    """
+    Делит словарь на диапазоны байтов и ставит их в очередь параллельно
+    """
+    job_id = job_id or str(uuid.uuid4())
+    wordlist_space = Wordlist.from_dict(wordlist, settings.WORDLIST_DIR)
+    shards = wordlist_space.split(chunk_size)
+    if not shards:
+        publish_job_message(job_id, client_id, "❌ Словарь пуст", "not_found", attempts=0)
+        algorithm_identity = HashAlgorithm.from_dict(algorithm).identity()
+        cache.release_inflight(cache.result_key(algorithm_identity, hash_to_crack, wordlist_space))
+        return job_id
+
+    run_id = run_id or jobs.start_run(job_id)
+    task_ids = [str(uuid.uuid4()) for _ in shards]
+    jobs.register_shards(job_id, task_ids)
+    publish_job_message(
+        job_id,
+        client_id,
+        f"📖 Начинаю перебор по словарю {wordlist_space.name} ({len(shards)} частей)...",
+        "start"
+    )
+
+    for task_id, shard in zip(task_ids, shards):
+        wordlist_shard_task.apply_async(
+            args=(hash_to_crack, client_id, job_id, shard, wordlist, algorithm, run_id),
+            task_id=task_id,
+            queue=queue
+        )
+    logger.info(f"Задача {job_id} по словарю разбита на {len(shards)} частей")
+    return job_id
+
+
+@shared_task(bind=True, name='app.celery.tasks.wordlist_shard_task',
+             acks_late=True, reject_on_worker_lost=True)
+def wordlist_shard_task(self, hash_to_crack: str, client_id: str, job_id: str, shard: dict,
+                        wordlist: dict, algorithm: Optional[dict] = None, run_id: Optional[str] = None):
+    """
+    Перебор одного диапазона байтов словаря с правилами изменения слов.
+    Контрольная точка — смещение первой непроверенной строки.
+    """
+    wordlist_space = Wordlist.from_dict(wordlist, settings.WORDLIST_DIR)
+    algorithm = HashAlgorithm.from_dict(algorithm)
+    key = cache.result_key(algorithm.identity(), hash_to_crack, wordlist_space)
+    checkpointer = make_checkpointer(key, shard)
+    state = checkpointer.load() or {"offset": shard["start"]}
+    try:
+        if jobs.stop_reason(job_id, run_id):
+            logger.info(f"Часть {shard} задачи {job_id} пропущена: задача завершена или перезапущена")
+            return None
+
+        started_at, resumed_attempts = jobs.get_timing(job_id)
+        reporter = ProgressReporter(
+            wordlist_space.size(),
+            settings.PROGRESS_MAX_RATE,
+            started_at=started_at,
+            resumed_attempts=resumed_attempts
+        )
+        total_attempts = 0
+        for batch in wordlist_space.search(hash_to_crack, dict(shard, start=state["offset"]),
+                                           SHARD_CHECK_INTERVAL, algorithm):
+            # Байты за концом диапазона принадлежат последней строке этого диапазона
+            processed = min(batch.offset, shard["stop"]) - min(state["offset"], shard["stop"])
+            state["offset"] = batch.offset
+            total_attempts, total_processed = jobs.add_processed(job_id, batch.checked, max(processed, 0))
+
+            if batch.found:
+                password = batch.found[hash_to_crack.lower()]
+                if jobs.mark_finished(job_id, password):
+                    finish_job(key, password)
+                    publish_job_message(
+                        job_id,
+                        client_id,
+                        f"✅ Пароль найден: {password} (после ~{total_attempts} попыток)",
+                        "success",
+                        password=password,
+                        attempts=total_attempts
+                    )
+                    celery_app.control.revoke(jobs.get_shard_ids(job_id))
+                return password
+
+            if jobs.stop_reason(job_id, run_id):
+                return None
+            if checkpointer.maybe_save(state):
+                cache.touch_inflight(key, settings.INFLIGHT_TTL)
+            if reporter.due():
+                reporter.mark()
+                if jobs.claim_progress_slot(job_id, reporter.interval):
+                    fields = progress_fields(reporter, total_attempts, batch.current, total_processed)
+                    publish_job_message(job_id, client_id, fields.pop("message"), "progress", **fields)
+
+        # Диапазон пройден целиком: при возобновлении задачи он будет пропущен
+        state["offset"] = shard["stop"]
+        checkpointer.save(state)
+        if jobs.finish_shard(job_id) and jobs.mark_finished(job_id, ""):
+            total_attempts = jobs.get_attempts(job_id)
+            finish_job(key, None)
+            publish_job_message(
+                job_id,
+                client_id,
+                f"❌ Пароль не найден в словаре после {total_attempts} попыток",
+                "not_found",
+                attempts=total_attempts
+            )
+        return None
+
+    except SoftTimeLimitExceeded:
+        checkpointer.save(state)
+        cache.touch_inflight(key, settings.INFLIGHT_TTL)
+        logger.warning(f"Лимит времени части {shard} задачи {job_id} исчерпан, повтор")
+        try:
+            raise self.retry(countdown=1, max_retries=settings.CHECKPOINT_MAX_RETRIES)
+        except MaxRetriesExceededError:
+            logger.error(f"Часть {shard} задачи {job_id} не уложилась в {settings.CHECKPOINT_MAX_RETRIES} повторов")
+            if jobs.mark_finished(job_id, ""):
+                cache.release_inflight(key)
+                publish_job_message(job_id, client_id, TIME_LIMIT_MESSAGE, "error")
+            raise
+
+    except Exception as e:
+        logger.error(f"Ошибка в части {shard} задачи {job_id}: {e}")
+        if jobs.mark_finished(job_id, ""):
+            cache.release_inflight(key)
+            publish_job_message(job_id, client_id, f"⚠️ Произошла ошибка: {str(e)}", "error")
+        raise
@@ -1,10 +1,69 @@
+import os
 from pydantic_settings import BaseSettings
-from app.core.redislite_init import redis_instance, redis_socket
+from app.bruteforce.lookup_index import DEFAULT_INDEX_PATH
+from app.bruteforce.wordlist import DEFAULT_WORDLIST_DIR
+
+# База встроенного redislite лежит рядом с приложением, а не в текущем каталоге
+DEFAULT_REDISLITE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))), "redis.db")
 
 class Settings(BaseSettings):
-    # Настройки Celery с использованием Unix-сокета redislite
-    CELERY_BROKER_URL: str = f"redis+socket://{redis_socket}"
-    CELERY_RESULT_BACKEND: str = f"redis+socket://{redis_socket}"
+    # Внешний Redis (redis://host:6379/0). Пусто — встроенный redislite с базой REDISLITE_PATH
+    REDIS_URL: str = ""
+    REDISLITE_PATH: str = DEFAULT_REDISLITE_PATH
+    # Размер общего пула соединений процесса и сколько секунд ждать свободного соединения
+    REDIS_MAX_CONNECTIONS: int = 32
+    REDIS_POOL_TIMEOUT: int = 20
+    # Брокер и бэкенд результатов Celery. Пусто — тот же Redis, что и для остальных данных
+    CELERY_BROKER_URL: str = ""
+    CELERY_RESULT_BACKEND: str = ""
+    # Сколько задач выполняет процесс воркера до перезапуска (0 — не перезапускать)
+    WORKER_MAX_TASKS_PER_CHILD: int = 0
+
+    # Количество кандидатов в одном шарде при шардированном переборе
+    BRUTEFORCE_SHARD_SIZE: int = 5_000_000
+    # Наибольшее число шардов задачи: для больших пространств шарды укрупняются
+    BRUTEFORCE_MAX_SHARDS: int = 1000
+    # Движок перебора: "prefix" (инкрементальный MD5) или "reference" (эталонный цикл)
+    BRUTEFORCE_ENGINE: str = "prefix"
+    # Предрасчитанный индекс MD5 для коротких паролей (пустая строка — не использовать).
+    # Строится командой: python -m app.bruteforce.lookup_index build
+    LOOKUP_INDEX_PATH: str = DEFAULT_INDEX_PATH
+    # Каталог словарей для перебора по словарю и размер диапазона байтов на один шард
+    WORDLIST_DIR: str = DEFAULT_WORDLIST_DIR
+    WORDLIST_CHUNK_SIZE: int = 64 * 1024 * 1024
+    # Где выполнять перебор: "celery" (брокер и воркеры) или "local" (пул процессов API)
+    EXECUTION_BACKEND: str = "celery"
+    # Количество процессов локального пула (0 — по числу ядер)
+    LOCAL_WORKERS: int = 0
+    # Задачи с оценкой стоимости (кандидатов) не больше этой идут в очередь дешевых задач
+    SMALL_JOB_MAX_COST: int = 50_000_000
+    # Максимальная длина пароля, которую можно запросить (в том числе длина маски)
+    MAX_PASSWORD_LENGTH: int = 8
+    # Ожидаемая скорость перебора (хешей/сек) для оценки времени до запуска задачи
+    ESTIMATED_HASH_RATE: int = 1_000_000
+
+    # Кэш результатов перебора: время жизни записи (сек) и максимальное число записей
+    RESULT_CACHE_TTL: int = 7 * 24 * 60 * 60
+    RESULT_CACHE_MAX_SIZE: int = 100_000
+    # Сколько секунд считать перебор выполняющимся (не больше task_time_limit)
+    INFLIGHT_TTL: int = 3600
+
+    # Как часто (сек) сохранять позицию перебора и сколько раз повторять задачу по таймауту
+    CHECKPOINT_INTERVAL: float = 10.0
+    CHECKPOINT_MAX_RETRIES: int = 100
+    # Должен быть больше task_time_limit, иначе выполняющиеся задачи будут выданы повторно
+    BROKER_VISIBILITY_TIMEOUT: int = 3900
+
+    # Не больше стольких сообщений о прогрессе в секунду на задачу
+    PROGRESS_MAX_RATE: float = 2.0
+    # Уровень логирования сообщений о прогрессе (INFO — писать каждое сообщение)
+    PROGRESS_LOG_LEVEL: str = "DEBUG"
+
+    # Эндпоинт /metrics и сбор метрик задач и доставки сообщений
+    METRICS_ENABLED: bool = True
+    # Задача без сообщений о прогрессе дольше стольких секунд пропадает из метрик
+    METRICS_JOB_TTL: int = 60
 
 # Создаем экземпляр настроек
 settings = Settings() 
\ No newline at end of file
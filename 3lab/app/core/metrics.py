@@ -0,0 +1,169 @@
+import json
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+
+# Метрики задач пишут воркеры, а читает процесс API, поэтому они хранятся в Redis.
+# Метрики самого API (задержка доставки) живут в памяти процесса.
+JOBS_KEY = "bruteforce:metrics:jobs"
+JOBS_UPDATED_KEY = "bruteforce:metrics:jobs_updated"
+FINISHED_KEY = "bruteforce:metrics:finished"
+
+# Границы корзин гистограммы задержки доставки (сек)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    """
+    Гистограмма в формате Prometheus: накопительные корзины, сумма и количество
+    """
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str) -> List[Tuple[str, Dict[str, str], float]]:
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            samples.append((f"{name}_bucket", {"le": le}, cumulative))
+        samples.append((f"{name}_sum", {}, self.sum))
+        samples.append((f"{name}_count", {}, self.count))
+        return samples
+
+
+delivery_latency = Histogram(LATENCY_BUCKETS)
+
+
+def report_job(job_id: str, fields: dict):
+    """
+    Сохраняет скорость и прогресс задачи. Вызывается вместе с сообщением
+    о прогрессе, которое и так отправляется не чаще PROGRESS_MAX_RATE в секунду,
+    поэтому цикл перебора метрики не замедляют.
+    """
+    if not settings.METRICS_ENABLED:
+        return
+    data = json.dumps({
+        "hashes_per_sec": fields.get("hashes_per_sec", 0),
+        "attempts": fields.get("attempts", 0),
+        "percent": fields.get("percent", 0.0),
+    })
+    pipe = get_redis().pipeline()
+    pipe.hset(JOBS_KEY, job_id, data)
+    pipe.zadd(JOBS_UPDATED_KEY, {job_id: time.time()})
+    pipe.execute()
+
+
+def report_finished(job_id: str, status: str):
+    """
+    Убирает задачу из выполняющихся и увеличивает счетчик завершенных
+    """
+    if not settings.METRICS_ENABLED:
+        return
+    pipe = get_redis().pipeline()
+    pipe.hdel(JOBS_KEY, job_id)
+    pipe.zrem(JOBS_UPDATED_KEY, job_id)
+    pipe.hincrby(FINISHED_KEY, status, 1)
+    pipe.execute()
+
+
+def active_jobs() -> Dict[str, dict]:
+    """
+    Метрики задач, присылавших прогресс за последние METRICS_JOB_TTL секунд.
+    Задачи упавших воркеров так и не сообщают о завершении и удаляются здесь.
+    """
+    redis = get_redis()
+    stale = redis.zrangebyscore(JOBS_UPDATED_KEY, 0, time.time() - settings.METRICS_JOB_TTL)
+    if stale:
+        pipe = redis.pipeline()
+        pipe.hdel(JOBS_KEY, *stale)
+        pipe.zrem(JOBS_UPDATED_KEY, *stale)
+        pipe.execute()
+    return {
+        (job_id.decode() if isinstance(job_id, bytes) else job_id): json.loads(data)
+        for job_id, data in redis.hgetall(JOBS_KEY).items()
+    }
+
+
+def finished_counts() -> Dict[str, int]:
+    return {
+        (status.decode() if isinstance(status, bytes) else status): int(count)
+        for status, count in get_redis().hgetall(FINISHED_KEY).items()
+    }
+
+
+def queue_depths(queues: Iterable[str]) -> Dict[str, int]:
+    """
+    Длина очередей Celery: транспорт Redis хранит каждую очередь в списке с ее именем
+    """
+    pipe = get_redis().pipeline()
+    queues = list(queues)
+    for queue in queues:
+        pipe.llen(queue)
+    return dict(zip(queues, pipe.execute()))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def render(metrics: List[Tuple[str, str, str, List[Tuple[str, Dict[str, str], float]]]]) -> str:
+    """
+    Текстовый формат Prometheus. metrics — (имя, тип, описание, [(имя, метки, значение)])
+    """
+    lines = []
+    for name, metric_type, help_text, samples in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for sample_name, labels, value in samples:
+            lines.append(f"{sample_name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def collect(queues: Iterable[str], websocket_connections: int) -> str:
+    jobs = active_jobs()
+    return render([
+        ("bruteforce_job_hashes_per_second", "gauge", "Скорость перебора задачи",
+         [("bruteforce_job_hashes_per_second", {"job_id": job_id}, data["hashes_per_sec"])
+          for job_id, data in jobs.items()]),
+        ("bruteforce_job_attempts", "gauge", "Проверено кандидатов в задаче",
+         [("bruteforce_job_attempts", {"job_id": job_id}, data["attempts"])
+          for job_id, data in jobs.items()]),
+        ("bruteforce_job_progress_ratio", "gauge", "Пройденная доля пространства перебора",
+         [("bruteforce_job_progress_ratio", {"job_id": job_id}, data["percent"] / 100)
+          for job_id, data in jobs.items()]),
+        ("bruteforce_jobs_finished_total", "counter", "Завершенные задачи по итогу",
+         [("bruteforce_jobs_finished_total", {"status": status}, count)
+          for status, count in finished_counts().items()]),
+        ("bruteforce_queue_depth", "gauge", "Задачи в очереди Celery",
+         [("bruteforce_queue_depth", {"queue": queue}, depth)
+          for queue, depth in queue_depths(queues).items()]),
+        ("bruteforce_websocket_connections", "gauge", "Открытые WebSocket соединения процесса API",
+         [("bruteforce_websocket_connections", {}, websocket_connections)]),
+        ("bruteforce_delivery_latency_seconds", "histogram",
+         "Задержка от публикации сообщения до отправки в WebSocket",
+         delivery_latency.samples("bruteforce_delivery_latency_seconds")),
+    ])
+
+
+def observe_delivery(published_at: Optional[float]):
+    if published_at is not None:
+        delivery_latency.observe(max(time.time() - published_at, 0.0))
@@ -0,0 +1,57 @@
+import threading
+from typing import Optional
+
+import redis
+
+from app.core.config import settings
+
+# Встроенный сервер и пул создаются при первом обращении, а не при импорте:
+# с внешним Redis redislite не импортируется и не запускается вовсе
+_lock = threading.RLock()
+_embedded = None
+_client: Optional[redis.Redis] = None
+
+
+def _embedded_socket() -> str:
+    """
+    Запускает встроенный redislite или подключается к уже запущенному
+    другим процессом с тем же файлом базы. Возвращает путь к Unix-сокету.
+    """
+    global _embedded
+    with _lock:
+        if _embedded is None:
+            import redislite
+            _embedded = redislite.Redis(settings.REDISLITE_PATH, serverconfig={'port': '6379'})
+        return _embedded.socket_file
+
+
+def get_redis_url() -> str:
+    """
+    Адрес Redis для redis-py: внешний сервер или сокет встроенного redislite
+    """
+    return settings.REDIS_URL or f"unix://{_embedded_socket()}"
+
+
+def get_celery_url() -> str:
+    """
+    Адрес Redis для брокера и бэкенда результатов Celery (kombu)
+    """
+    return settings.REDIS_URL or f"redis+socket://{_embedded_socket()}"
+
+
+def get_redis() -> redis.Redis:
+    """
+    Общий клиент процесса. Соединения берутся из одного пула; после fork
+    redis-py сам пересоздает пул в дочернем процессе.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                pool = redis.BlockingConnectionPool.from_url(
+                    get_redis_url(),
+                    max_connections=settings.REDIS_MAX_CONNECTIONS,
+                    timeout=settings.REDIS_POOL_TIMEOUT
+                )
+                _client = redis.Redis(connection_pool=pool)
+    return _client
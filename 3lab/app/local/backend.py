@@ -0,0 +1,279 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from app.bruteforce import cache, jobs
+from app.bruteforce.algorithms import HashAlgorithm
+from app.bruteforce.keyspace import Keyspace
+from app.bruteforce.progress import ProgressReporter
+from app.bruteforce.wordlist import Wordlist
+from app.celery.tasks import finish_job, multi_summary, progress_fields, publish_job_message
+from app.core.config import settings
+from app.local.worker import search_chunk
+
+logger = logging.getLogger(__name__)
+
+# На сколько частей делить пространство на каждый процесс: мелкие части
+# выравнивают нагрузку, когда пароль находится в начале пространства
+CHUNKS_PER_WORKER = 4
+# Как часто процесс проверяет сигнал остановки (в кандидатах)
+LOCAL_BATCH_SIZE = 32768
+# Как часто (сек) координатор проверяет, не отменена ли задача
+CANCEL_CHECK_INTERVAL = 0.5
+
+
+class LocalBackend:
+    """
+    Выполнение перебора без брокера: части пространства распределяются по
+    процессам ProcessPoolExecutor текущей машины.
+
+    Процессы пула живут все время работы API, поэтому задача не ждет ни
+    брокера, ни перезапуска воркера. Уведомления публикуются тем же путем,
+    что и из задач Celery, и доставляются клиентам общим диспетчером.
+    Контрольные точки не сохраняются: режим рассчитан на небольшие задачи.
+    """
+
+    def __init__(self, workers: int = 0):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: процесс API уже держит потоки и соединения, fork их бы унаследовал
+                context = multiprocessing.get_context("spawn")
+                self._manager = context.Manager()
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=context)
+                logger.info(f"Локальный пул перебора запущен: {self.workers} процессов")
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._manager.shutdown()
+                self._executor = None
+                self._manager = None
+
+    def submit(self, job_id: str, key: str, params: dict):
+        """
+        Запускает перебор одного хеша в фоновом потоке-координаторе
+        """
+        self._ensure_started()
+        thread = threading.Thread(
+            target=self._run_single,
+            args=(job_id, key, params),
+            name=f"local-job-{job_id}",
+            daemon=True
+        )
+        thread.start()
+
+    def submit_multi(self, job_id: str, hashes: List[str], client_id: str,
+                     keyspace: dict, algorithm: dict, answered: Optional[dict] = None):
+        """
+        Запускает перебор нескольких хешей за один проход
+        """
+        self._ensure_started()
+        thread = threading.Thread(
+            target=self._run_multi,
+            args=(job_id, hashes, client_id, keyspace, algorithm, answered),
+            name=f"local-job-{job_id}",
+            daemon=True
+        )
+        thread.start()
+
+    def _chunks(self, space, base: dict) -> List[dict]:
+        """
+        Делит пространство (Keyspace или Wordlist) на части для процессов пула
+        """
+        chunk_size = max(space.size() // (self.workers * CHUNKS_PER_WORKER), 1)
+        return [dict(base, shard=shard) for shard in space.split(chunk_size)]
+
+    def _search(self, job_id: str, space, hashes: List[str], algorithm: HashAlgorithm,
+                base: dict, on_progress, on_found):
+        """
+        Раздает части процессам и собирает их сообщения. Возвращает число попыток.
+        on_found(hash, password, attempts) возвращает True, когда перебор можно остановить.
+        """
+        stop_event = self._manager.Event()
+        updates = self._manager.Queue()
+        chunk_base = dict(base, hashes=hashes, algorithm=algorithm.to_dict(), batch_size=LOCAL_BATCH_SIZE)
+        futures = [
+            self._executor.submit(search_chunk, chunk, stop_event, updates)
+            for chunk in self._chunks(space, chunk_base)
+        ]
+
+        attempts = 0
+        processed = 0
+        next_cancel_check = time.monotonic() + CANCEL_CHECK_INTERVAL
+        while True:
+            if time.monotonic() >= next_cancel_check:
+                next_cancel_check = time.monotonic() + CANCEL_CHECK_INTERVAL
+                if jobs.is_finished(job_id):
+                    stop_event.set()
+            try:
+                checked, found, current, done = updates.get(timeout=0.1)
+            except queue.Empty:
+                if all(future.done() for future in futures) and updates.empty():
+                    break
+                continue
+            attempts += checked
+            processed += done
+            for hash_value, password in found.items():
+                if on_found(hash_value, password, attempts):
+                    stop_event.set()
+            on_progress(attempts, current, processed)
+
+        for future in futures:
+            if future.exception() is not None:
+                raise future.exception()
+        return attempts
+
+    def _space(self, params: dict):
+        if params.get("wordlist"):
+            return Wordlist.from_dict(params["wordlist"], settings.WORDLIST_DIR)
+        return Keyspace.from_dict(params.get("keyspace"))
+
+    def _base_chunk(self, params: dict) -> dict:
+        return {
+            "engine": settings.BRUTEFORCE_ENGINE,
+            "keyspace": params.get("keyspace"),
+            "wordlist": params.get("wordlist"),
+            "wordlist_dir": settings.WORDLIST_DIR,
+        }
+
+    def _run_single(self, job_id: str, key: str, params: dict):
+        hash_to_crack = params["hash_to_crack"]
+        client_id = params["client_id"]
+        result = {}
+        try:
+            space = self._space(params)
+            algorithm = HashAlgorithm.from_dict(params.get("algorithm"))
+            reporter = ProgressReporter(space.size(), settings.PROGRESS_MAX_RATE)
+            logger.info(f"Локальный перебор хеша {hash_to_crack} (клиент: {client_id})")
+            publish_job_message(
+                job_id, client_id, f"🔍 Начинаю локальный брутфорс ({self.workers} процессов)...", "start"
+            )
+
+            def on_found(hash_value, password, attempts):
+                # Сообщаем сразу, не дожидаясь остановки остальных процессов
+                result.update(password=password)
+                finish_job(key, password)
+                publish_job_message(
+                    job_id,
+                    client_id,
+                    f"✅ Пароль найден: {password} (после ~{attempts} попыток)",
+                    "success",
+                    password=password,
+                    attempts=attempts
+                )
+                return True
+
+            def on_progress(attempts, current, processed):
+                # После отмены процессы еще досылают пачки: задача не должна вернуться в метрики
+                if not result and reporter.due() and not jobs.is_finished(job_id):
+                    reporter.mark()
+                    fields = progress_fields(reporter, attempts, current, processed)
+                    publish_job_message(job_id, client_id, fields.pop("message"), "progress", **fields)
+
+            total_attempts = self._search(
+                job_id, space, [hash_to_crack], algorithm, self._base_chunk(params), on_progress, on_found
+            )
+            if jobs.is_finished(job_id):
+                logger.info(f"Задача {job_id} отменена")
+            elif not result:
+                finish_job(key, None)
+                publish_job_message(
+                    job_id,
+                    client_id,
+                    f"❌ Пароль не найден после {total_attempts} попыток",
+                    "not_found",
+                    attempts=total_attempts
+                )
+        except Exception as e:
+            logger.error(f"Ошибка локального перебора задачи {job_id}: {e}")
+            if not result:
+                cache.release_inflight(key)
+                publish_job_message(job_id, client_id, f"⚠️ Произошла ошибка: {str(e)}", "error")
+
+    def _run_multi(self, job_id: str, hashes: List[str], client_id: str,
+                   keyspace: dict, algorithm: dict, answered: Optional[dict] = None):
+        remaining = set(hashes)
+        cracked: Dict[str, str] = {}
+        try:
+            space = Keyspace.from_dict(keyspace)
+            hash_algorithm = HashAlgorithm.from_dict(algorithm)
+            reporter = ProgressReporter(space.size(), settings.PROGRESS_MAX_RATE)
+            publish_job_message(
+                job_id, client_id, f"🔍 Начинаю локальный брутфорс {len(hashes)} хешей...", "start"
+            )
+
+            def on_found(hash_value, password, attempts):
+                if hash_value in remaining:
+                    remaining.discard(hash_value)
+                    cracked[hash_value] = password
+                    cache.store_result(
+                        cache.result_key(hash_algorithm.identity(), hash_value, space),
+                        password,
+                        settings.RESULT_CACHE_TTL,
+                        settings.RESULT_CACHE_MAX_SIZE
+                    )
+                    publish_job_message(
+                        job_id,
+                        client_id,
+                        f"✅ {hash_value}: {password} (после ~{attempts} попыток)",
+                        "found",
+                        hash=hash_value,
+                        password=password
+                    )
+                return not remaining
+
+            def on_progress(attempts, current, processed):
+                if reporter.due() and not jobs.is_finished(job_id):
+                    reporter.mark()
+                    fields = progress_fields(reporter, attempts, current, processed)
+                    publish_job_message(
+                        job_id,
+                        client_id,
+                        f"{fields.pop('message')}, найдено {len(cracked)} из {len(hashes)}",
+                        "progress",
+                        cracked_count=len(cracked),
+                        **fields
+                    )
+
+            total_attempts = self._search(
+                job_id, space, hashes, hash_algorithm, self._base_chunk({"keyspace": keyspace}), on_progress, on_found
+            )
+            # Отмененная задача прошла пространство не целиком: "не найден" не кэшируем
+            if jobs.is_finished(job_id):
+                logger.info(f"Задача {job_id} отменена")
+                return
+            for hash_value in remaining:
+                cache.store_result(
+                    cache.result_key(hash_algorithm.identity(), hash_value, space),
+                    None,
+                    settings.RESULT_CACHE_TTL,
+                    settings.RESULT_CACHE_MAX_SIZE
+                )
+            summary = multi_summary(cracked, remaining, answered)
+            publish_job_message(
+                job_id,
+                client_id,
+                f"🏁 Найдено {len(summary['cracked'])} из "
+                f"{len(summary['cracked']) + len(summary['not_found'])} паролей после {total_attempts} попыток",
+                "done",
+                attempts=total_attempts,
+                **summary
+            )
+        except Exception as e:
+            logger.error(f"Ошибка локального перебора задачи {job_id}: {e}")
+            publish_job_message(job_id, client_id, f"⚠️ Произошла ошибка: {str(e)}", "error")
+
+
+local_backend = LocalBackend(settings.LOCAL_WORKERS)
@@ -0,0 +1,43 @@
+# Функции, выполняемые в процессах локального пула. Модуль импортируется
+# дочерними процессами, поэтому не должен тянуть за собой настройки, Redis
+# и Celery: только движки перебора.
+from app.bruteforce.algorithms import HashAlgorithm
+from app.bruteforce.engine import get_engine
+from app.bruteforce.keyspace import Keyspace
+from app.bruteforce.wordlist import Wordlist
+
+
+def search_chunk(chunk: dict, stop_event, updates) -> int:
+    """
+    Перебирает один шард (или диапазон байтов словаря) и отправляет
+    в очередь updates кортежи (проверено, найдено, текущий, пройдено).
+    Останавливается, как только координатор выставит stop_event.
+    """
+    # Часть ждала в очереди пула, пока другие процессы уже нашли пароль
+    if stop_event.is_set():
+        return 0
+    algorithm = HashAlgorithm.from_dict(chunk["algorithm"])
+    shard = chunk["shard"]
+    if chunk.get("wordlist"):
+        wordlist = Wordlist.from_dict(chunk["wordlist"], chunk["wordlist_dir"])
+        batches = wordlist.search_many(chunk["hashes"], shard, chunk["batch_size"], algorithm)
+    else:
+        engine = get_engine(
+            chunk["engine"], Keyspace.from_dict(chunk["keyspace"]), chunk["batch_size"], algorithm
+        )
+        batches = engine.search_many(chunk["hashes"], shard)
+
+    checked = 0
+    position = shard["start"]
+    for batch in batches:
+        checked += batch.checked
+        # Для словаря прогресс считается в байтах, для пространства паролей — в кандидатах
+        if chunk.get("wordlist"):
+            offset = min(batch.offset, shard["stop"])
+            processed, position = offset - position, offset
+        else:
+            processed = batch.checked
+        updates.put((batch.checked, batch.found, batch.current, processed))
+        if stop_event.is_set():
+            break
+    return checked
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class BruteforceTask(BaseModel):
@@ -5,5 +6,10 @@ class BruteforceTask(BaseModel):
 
 class BruteforceResult(BaseModel):
     task_id: str
+    # queued, running, cracked, not_found, done, error, cancelled
     status: str
-    result: str | None = None 
\ No newline at end of file
+    result: str | None = None
+    attempts: Optional[int] = None
+    # Оценка стоимости (кандидатов) и очередь, в которую отправлена задача
+    cost: Optional[int] = None
+    queue: Optional[str] = None 
\ No newline at end of file
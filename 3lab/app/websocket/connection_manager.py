@@ -1,22 +1,60 @@
 from fastapi import WebSocket
-from typing import Dict
+from typing import Dict, Set
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
+        # У одного клиента может быть несколько открытых сокетов
+        self.active_connections: Dict[str, Set[WebSocket]] = {}
+        # Сокеты, которые не закрываются после финального сообщения задачи:
+        # по ним клиент получает результаты нескольких задач
+        self.persistent: Set[WebSocket] = set()
 
-    async def connect(self, websocket: WebSocket, client_id: str):
+    async def connect(self, websocket: WebSocket, client_id: str, persistent: bool = False):
         await websocket.accept()
-        self.active_connections[client_id] = websocket
+        self.active_connections.setdefault(client_id, set()).add(websocket)
+        if persistent:
+            self.persistent.add(websocket)
 
-    def disconnect(self, client_id: str):
-        if client_id in self.active_connections:
+    def disconnect(self, client_id: str, websocket: WebSocket = None):
+        connections = self.active_connections.get(client_id)
+        if connections is None:
+            return
+        if websocket is None:
+            self.persistent.difference_update(connections)
+            connections.clear()
+        else:
+            connections.discard(websocket)
+            self.persistent.discard(websocket)
+        if not connections:
             del self.active_connections[client_id]
 
+    def is_connected(self, client_id: str) -> bool:
+        return client_id in self.active_connections
+
+    def count(self) -> int:
+        return sum(len(connections) for connections in self.active_connections.values())
+
     async def send_message(self, message: str, client_id: str):
-        if client_id in self.active_connections:
-            await self.active_connections[client_id].send_text(message)
+        for websocket in list(self.active_connections.get(client_id, ())):
+            try:
+                await websocket.send_text(message)
+            except Exception:
+                # Сокет уже закрыт клиентом
+                self.disconnect(client_id, websocket)
+
+    async def close(self, client_id: str):
+        """
+        Закрывает сокеты клиента, кроме постоянных
+        """
+        for websocket in list(self.active_connections.get(client_id, ())):
+            if websocket in self.persistent:
+                continue
+            try:
+                await websocket.close()
+            except Exception:
+                pass
+            self.disconnect(client_id, websocket)
 
     async def broadcast(self, message: str):
-        for connection in self.active_connections.values():
-            await connection.send_text(message) 
\ No newline at end of file
+        for client_id in list(self.active_connections):
+            await self.send_message(message, client_id)
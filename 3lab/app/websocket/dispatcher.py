@@ -0,0 +1,127 @@
+import asyncio
+import json
+import logging
+from typing import Optional
+
+import redis.asyncio as aioredis
+
+from app.celery.tasks import NOTIFICATION_CHANNEL, FINAL_MESSAGE_TYPES, pending_key
+from app.core import metrics
+from app.core.config import settings
+from app.core.redis_client import get_redis_url
+from app.websocket.connection_manager import ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationDispatcher:
+    """
+    Один асинхронный подписчик Redis на процесс API.
+
+    Подписывается по шаблону на каналы всех клиентов и пересылает сообщение
+    только в сокеты его клиента через ConnectionManager. Сообщения для
+    клиентов, не подключенных к этому процессу, не декодируются.
+    """
+
+    def __init__(self, manager: ConnectionManager):
+        self.manager = manager
+        self._redis: Optional[aioredis.Redis] = None
+        self._task: Optional[asyncio.Task] = None
+        self._prefix = f"{NOTIFICATION_CHANNEL}:"
+
+    @property
+    def redis(self) -> aioredis.Redis:
+        if self._redis is None:
+            # Один пул на процесс для подписки и чтения отложенных сообщений
+            self._redis = aioredis.from_url(get_redis_url(), max_connections=settings.REDIS_MAX_CONNECTIONS)
+        return self._redis
+
+    def ensure_started(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def pop_pending(self, client_id: str, job_id: Optional[str] = None) -> list:
+        """
+        Забирает сообщения, опубликованные до подключения клиента.
+        С job_id только сообщения этой задачи: итог прошлой задачи того же
+        клиента не должен закрыть сокет новой. Остальные хранятся до конца PENDING_TTL.
+        """
+        key = pending_key(client_id)
+        if job_id is None:
+            async with self.redis.pipeline() as pipe:
+                pipe.lrange(key, 0, -1)
+                pipe.delete(key)
+                messages, _ = await pipe.execute()
+            return [json.loads(data) for data in messages]
+
+        selected = []
+        for data in await self.redis.lrange(key, 0, -1):
+            json_data = json.loads(data)
+            if json_data.get("job_id") == job_id:
+                selected.append((data, json_data))
+        if selected:
+            async with self.redis.pipeline() as pipe:
+                for data, _ in selected:
+                    pipe.lrem(key, 1, data)
+                await pipe.execute()
+        return [json_data for _, json_data in selected]
+
+    async def _run(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(f"{self._prefix}*")
+                logger.info(f"Диспетчер подписан на каналы {self._prefix}*")
+                # listen() ждет сообщений без опроса и пауз
+                async for message in pubsub.listen():
+                    await self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка подписки диспетчера, переподключение: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+
+    async def _dispatch(self, message: dict):
+        channel = message["channel"]
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        client_id = channel[len(self._prefix):]
+        if not self.manager.is_connected(client_id):
+            return
+
+        data = message["data"]
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        try:
+            json_data = json.loads(data)
+        except json.JSONDecodeError:
+            logger.error(f"Ошибка декодирования JSON: {data}")
+            return
+
+        await self.manager.send_message(data, client_id)
+        if settings.METRICS_ENABLED:
+            metrics.observe_delivery(json_data.get("published_at"))
+        # Если это финальное сообщение, закрываем соединения клиента
+        if json_data.get("type") in FINAL_MESSAGE_TYPES:
+            logger.info(f"Получено финальное сообщение для клиента {client_id}")
+            # Клиент получил итог, повторно при следующем подключении он не нужен
+            await self.redis.lrem(pending_key(client_id), 1, data)
+            await self.manager.close(client_id)
+
+
+manager = ConnectionManager()
+dispatcher = NotificationDispatcher(manager)
@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from app.bruteforce.algorithms import HASH_FUNCTIONS, HashAlgorithm
+from app.bruteforce.engine import ENGINES
+from app.bruteforce.keyspace import Keyspace
+
+# Алгоритмы набора: все хеш-функции без соли и с солью перед паролем и после него
+ALGORITHMS = {
+    **{name: HashAlgorithm(name) for name in HASH_FUNCTIONS},
+    "md5(salt+pw)": HashAlgorithm("md5", "s4lt", "prefix"),
+    "md5(pw+salt)": HashAlgorithm("md5", "s4lt", "suffix"),
+}
+
+
+def unreachable_hashes(count: int, algorithm: HashAlgorithm) -> list:
+    """
+    Случайные хеши, которых практически наверняка нет в срезе: перебирается весь срез
+    """
+    return [os.urandom(algorithm.digest_size).hex() for _ in range(count)]
+
+
+def benchmark_engine(name: str, shard: dict, hashes: list, algorithm: HashAlgorithm) -> float:
+    """
+    Возвращает скорость движка в кандидатах в секунду на заданном шарде
+    """
+    engine = ENGINES[name](Keyspace(), algorithm=algorithm)
+    checked = 0
+    started = time.perf_counter()
+    for batch in engine.search_many(hashes, shard):
+        checked += batch.checked
+    elapsed = time.perf_counter() - started
+    return checked / elapsed
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Сочетания алгоритм/движок, скорость которых упала ниже baseline * (1 - tolerance)
+    """
+    regressions = []
+    for combination, rate in results.items():
+        expected = baseline.get(combination)
+        if expected and rate < expected * (1 - tolerance):
+            regressions.append((combination, rate, expected))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Скорость движков перебора по алгоритмам")
+    parser.add_argument("--length", type=int, default=4, help="Длина паролей в срезе")
+    parser.add_argument("--prefixes", type=int, default=4, help="Количество первых символов в срезе")
+    parser.add_argument("--targets", type=int, default=1, help="Количество целевых хешей")
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS), choices=list(ALGORITHMS),
+                        help="Алгоритмы для замера")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES),
+                        help="Движки для замера")
+    parser.add_argument("--save", help="Сохранить результаты в JSON файл (новый baseline)")
+    parser.add_argument("--baseline", help="Сравнить с результатами из JSON файла")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Допустимое падение скорости относительно baseline (доля)")
+    args = parser.parse_args()
+
+    shard = {"length": args.length, "prefix_length": 1, "start": 0, "stop": args.prefixes}
+    print(f"Срез: {Keyspace().shard_size(shard)} кандидатов длины {args.length}, "
+          f"целевых хешей: {args.targets}")
+
+    results = {}
+    print(f"{'алгоритм':>12} {'движок':>10} {'кандидатов/сек':>16}")
+    for algorithm_name in args.algorithms:
+        algorithm = ALGORITHMS[algorithm_name]
+        hashes = unreachable_hashes(args.targets, algorithm)
+        for engine_name in args.engines:
+            rate = benchmark_engine(engine_name, shard, hashes, algorithm)
+            results[f"{algorithm_name}/{engine_name}"] = rate
+            print(f"{algorithm_name:>12} {engine_name:>10} {rate:>16,.0f}")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print(f"Результаты сохранены в {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        for combination, rate, expected in regressions:
+            print(f"❌ {combination}: {rate:,.0f} кандидатов/сек, baseline {expected:,.0f}")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ Скорость не ниже baseline (допуск {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 import argparse
+import httpx
 import requests
 import websockets
 import asyncio
 import json
 import sys
+import time
 import uuid
 from datetime import datetime
 
@@ -11,6 +13,8 @@ from datetime import datetime
 TEST_HASH = "098f6bcd4621d373cade4e832627b4f6"
 HTTP_URL = "http://localhost:8000"
 WS_URL = "ws://localhost:8000"
+# Сообщения, после которых задача больше ничего не пришлет
+FINAL_TYPES = ["success", "not_found", "error", "done", "cancelled"]
 
 def print_message(message, message_type=None):
     """
@@ -19,11 +23,22 @@ def print_message(message, message_type=None):
     timestamp = datetime.now().strftime("%H:%M:%S")
     print(f"[{timestamp}] {message}")
 
-async def connect_websocket(client_id):
+def build_urls(server, base_path=""):
+    """
+    Адреса HTTP и WebSocket с учетом префикса роутера (например, /bruteforce)
+    """
+    http_url = server.rstrip("/") + base_path.rstrip("/")
+    ws_url = "ws" + http_url[len("http"):]  # http -> ws, https -> wss
+    return http_url, ws_url
+
+async def connect_websocket(client_id, ws_url=WS_URL, job_id=None):
     """
     Подключение к WebSocket серверу и получение обновлений
     """
-    uri = f"{WS_URL}/ws/{client_id}"
+    uri = f"{ws_url}/ws/{client_id}"
+    if job_id:
+        # Сервер дошлет только сохраненные сообщения этой задачи
+        uri += f"?job_id={job_id}"
     try:
         async with websockets.connect(
             uri,
@@ -45,7 +60,7 @@ async def connect_websocket(client_id):
                         
                         # Если получено сообщение о завершении, прерываем цикл
                         msg_type = data.get("type", "")
-                        if msg_type in ["success", "not_found", "error"]:
+                        if msg_type in FINAL_TYPES:
                             break
                     except json.JSONDecodeError as e:
                         print_message(f"⚠️ Ошибка при разборе JSON: {e}")
@@ -80,14 +95,15 @@ async def keep_alive(websocket):
     except asyncio.CancelledError:
         pass
 
-def start_bruteforce(hash_to_crack, client_id):
+def start_bruteforce(hash_to_crack, client_id, keyspace=None, http_url=HTTP_URL):
     """
     Отправка запроса на начало брутфорса
     """
-    url = f"{HTTP_URL}/start"
+    url = f"{http_url}/start"
     data = {
         "hash_to_crack": hash_to_crack,
-        "client_id": client_id
+        "client_id": client_id,
+        **(keyspace or {})
     }
     try:
         response = requests.post(url, json=data)
@@ -97,26 +113,243 @@ def start_bruteforce(hash_to_crack, client_id):
         print_message(f"⚠️ Ошибка при отправке запроса: {e}")
         return None
 
+def read_hashes(source):
+    """
+    Хеши из файла или stdin ("-"): по одному в строке, пустые строки и # комментарии пропускаются
+    """
+    file = sys.stdin if source == "-" else open(source)
+    try:
+        lines = [line.strip() for line in file]
+    finally:
+        if file is not sys.stdin:
+            file.close()
+    # Повторы не отправляем: сервер все равно присоединит их к одной задаче
+    return list(dict.fromkeys(line for line in lines if line and not line.startswith("#")))
+
+class Batch:
+    """
+    Пакет хешей одного клиента. Все задачи публикуют сообщения в один
+    WebSocket, а сообщение относится к хешу по job_id.
+    """
+
+    def __init__(self, hashes):
+        self.items = {hash_value: {"hash": hash_value, "status": "pending"} for hash_value in hashes}
+        self.by_task = {}
+        # Сообщения задач, ответ на запуск которых еще не пришел
+        self.early = {}
+        self.completed = asyncio.Event()
+
+    def pending(self):
+        return [item for item in self.items.values() if "finished" not in item]
+
+    def finish(self, item, status, **fields):
+        if "finished" in item:
+            return
+        item.update(status=status, finished=time.monotonic(), **fields)
+        print_message(f"{item['hash']}: {status} {fields.get('password') or fields.get('error') or ''}")
+        if not self.pending():
+            self.completed.set()
+
+    def started(self, item, result):
+        """
+        Учитывает ответ /start: готовый результат или идентификатор задачи
+        """
+        if isinstance(result, list) or "error" in result:
+            # Ошибка сервера приходит как [{"error": ...}, 500]
+            error = result[0] if isinstance(result, list) else result
+            self.finish(item, "error", error=error.get("error"))
+        elif result.get("task_id") is None:
+            self.finish(item, result["status"], password=result.get("password"))
+        else:
+            task_id = result["task_id"]
+            item["task_id"] = task_id
+            self.by_task.setdefault(task_id, []).append(item)
+            for message in self.early.pop(task_id, []):
+                self.handle(message)
+
+    def handle(self, message):
+        task_id = message.get("job_id")
+        if task_id is None:
+            # Ответы из кэша и индекса уже учтены по ответу /start
+            return
+        if task_id not in self.by_task:
+            self.early.setdefault(task_id, []).append(message)
+            return
+        msg_type = message.get("type")
+        for item in self.by_task[task_id]:
+            if msg_type == "progress":
+                item["attempts"] = message.get("attempts", item.get("attempts"))
+            elif msg_type == "success":
+                self.finish(item, "cracked", password=message.get("password"))
+            elif msg_type in FINAL_TYPES:
+                self.finish(item, msg_type)
+
+async def submit_hash(http, semaphore, batch, item, client_id, keyspace):
+    async with semaphore:
+        item["submitted"] = time.monotonic()
+        try:
+            response = await http.post("/start", json={
+                "hash_to_crack": item["hash"],
+                "client_id": client_id,
+                **(keyspace or {})
+            })
+            result = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            batch.finish(item, "error", error=str(e))
+            return
+    if response.status_code >= 400:
+        batch.finish(item, "error", error=str(result.get("detail")))
+    else:
+        batch.started(item, result)
+
+async def receive_batch(websocket, batch):
+    async for message in websocket:
+        try:
+            batch.handle(json.loads(message))
+        except json.JSONDecodeError as e:
+            print_message(f"⚠️ Ошибка при разборе JSON: {e}")
+
+async def run_batch(hashes, client_id, keyspace, http_url, ws_url, concurrency, timeout=None):
+    """
+    Запускает перебор всех хешей параллельно и ждет результатов по одному WebSocket
+    """
+    batch = Batch(hashes)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    # Сокет открывается до отправки: ни одно сообщение о задачах пакета не теряется
+    uri = f"{ws_url}/ws/{client_id}?keep_open=true"
+    async with websockets.connect(uri, ping_interval=20, ping_timeout=60) as websocket:
+        async with httpx.AsyncClient(base_url=http_url, limits=limits, timeout=60) as http:
+            started = time.monotonic()
+            receiver = asyncio.create_task(receive_batch(websocket, batch))
+            semaphore = asyncio.Semaphore(concurrency)
+            await asyncio.gather(*(
+                submit_hash(http, semaphore, batch, item, client_id, keyspace)
+                for item in batch.items.values()
+            ))
+            print_message(f"📨 Отправлено {len(hashes)} хешей за {time.monotonic() - started:.2f} с")
+            try:
+                if batch.pending():
+                    await asyncio.wait(
+                        [receiver, asyncio.create_task(batch.completed.wait())],
+                        timeout=timeout,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+            finally:
+                receiver.cancel()
+            elapsed = time.monotonic() - started
+            for item in batch.pending():
+                batch.finish(item, "timeout")
+            await fetch_attempts(http, batch)
+    print_summary(batch, elapsed)
+
+async def fetch_attempts(http, batch):
+    """
+    Точное число попыток из /status: сообщения о прогрессе приходят не чаще PROGRESS_MAX_RATE
+    """
+    async def fetch(task_id):
+        try:
+            response = await http.get(f"/status/{task_id}")
+            if response.status_code == 200 and response.json().get("attempts") is not None:
+                for item in batch.by_task[task_id]:
+                    item["attempts"] = response.json()["attempts"]
+        except (httpx.HTTPError, ValueError):
+            pass
+
+    await asyncio.gather(*(fetch(task_id) for task_id in batch.by_task))
+
+def print_summary(batch, elapsed):
+    items = list(batch.items.values())
+    width = max(len(item["hash"]) for item in items)
+    print()
+    print(f"{'хеш':<{width}}  {'статус':<10} {'пароль':<16} {'время, с':>9} {'попыток':>14}")
+    for item in items:
+        duration = item["finished"] - item.get("submitted", item["finished"])
+        print(
+            f"{item['hash']:<{width}}  {item['status']:<10} {item.get('password') or '-':<16} "
+            f"{duration:>9.2f} {item.get('attempts') or 0:>14,}"
+        )
+    # Присоединенные хеши делят задачу: попытки каждой задачи считаются один раз
+    attempts = sum(tasks[0].get("attempts") or 0 for tasks in batch.by_task.values())
+    cracked = sum(1 for item in items if item["status"] == "cracked")
+    print()
+    print(f"Найдено {cracked} из {len(items)} за {elapsed:.2f} с, "
+          f"попыток: {attempts:,}, скорость: {attempts / max(elapsed, 1e-9):,.0f} хешей/с")
+
 def main():
     parser = argparse.ArgumentParser(description="Клиент для брутфорс API")
-    parser.add_argument("hash", help="MD5 хеш для взлома")
+    parser.add_argument("hash", nargs="?", help="Хеш для взлома (MD5, SHA-1 или SHA-256)")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Файл с хешами по одному в строке (- для stdin): пакетный режим")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="Сколько запросов на запуск отправлять одновременно в пакетном режиме")
+    parser.add_argument("--timeout", type=float, help="Сколько секунд ждать результатов пакета")
+    parser.add_argument("--server", default=HTTP_URL, help="Адрес API")
+    parser.add_argument("--base-path", default="",
+                        help="Префикс роутера, если API подключено не в корень (например, /bruteforce)")
     parser.add_argument("--client-id", default=str(uuid.uuid4()), help="ID клиента")
+    parser.add_argument("--charset", help="Алфавит, например ?l?d или abc?d")
+    parser.add_argument("--min-length", type=int, help="Минимальная длина пароля")
+    parser.add_argument("--max-length", type=int, help="Максимальная длина пароля")
+    parser.add_argument("--mask", help="Маска пароля, например ?u?l?l?d?d")
+    parser.add_argument("--algorithm", help="Алгоритм хеша, если не определять по длине")
+    parser.add_argument("--salt", help="Соль")
+    parser.add_argument("--salt-position", choices=("prefix", "suffix"), help="Соль перед паролем или после")
+    parser.add_argument("--wordlist", help="Словарь из каталога словарей сервера")
+    parser.add_argument("--rule", action="append", dest="rules",
+                        help="Правило изменения слов, например capitalize+append_digit")
     
     args = parser.parse_args()
+    keyspace = {
+        name: value
+        for name, value in (
+            ("charset", args.charset),
+            ("min_length", args.min_length),
+            ("max_length", args.max_length),
+            ("mask", args.mask),
+            ("algorithm", args.algorithm),
+            ("salt", args.salt),
+            ("salt_position", args.salt_position),
+            ("wordlist", args.wordlist),
+            ("rules", args.rules),
+        )
+        if value is not None
+    }
+    if (args.hash is None) == (args.batch is None):
+        parser.error("укажите хеш или --batch")
+    http_url, ws_url = build_urls(args.server, args.base_path)
     
     try:
+        if args.batch:
+            hashes = read_hashes(args.batch)
+            print_message(f"🎯 Пакетный режим: {len(hashes)} хешей")
+            asyncio.run(run_batch(
+                hashes, args.client_id, keyspace, http_url, ws_url, args.concurrency, args.timeout
+            ))
+            return
+
+
         print_message(f"🎯 Начинаем взлом хеша: {args.hash}")
         
         # Запускаем брутфорс
-        result = start_bruteforce(args.hash, args.client_id)
+        result = start_bruteforce(args.hash, args.client_id, keyspace, http_url)
         if result is None:
             print_message("❌ Не удалось запустить брутфорс")
             return
+
+        # Короткие пароли сервер находит по индексу сразу, без запуска задачи
+        if result.get("status") == "cracked":
+            print_message(f"✅ Пароль найден: {result.get('password')}")
+            return
         
         print_message(f"✅ Задача запущена: {result.get('task_id')}")
+        if "keyspace" in result:
+            print_message(
+                f"📐 Паролей в пространстве перебора: {result['keyspace']}, "
+                f"оценка времени: {result['estimated_time']}"
+            )
         
         # Запускаем WebSocket клиент
-        asyncio.run(connect_websocket(args.client_id))
+        asyncio.run(connect_websocket(args.client_id, ws_url, result.get("task_id")))
     except KeyboardInterrupt:
         print_message("\n⛔️ Прерывание работы...")
     except Exception as e:
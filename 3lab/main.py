@@ -1,8 +1,26 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.api.endpoints.bruteforce import router
+from app.celery.celery_app import SMALL_JOBS_QUEUE, LARGE_JOBS_QUEUE
+from app.core import metrics
+from app.core.config import settings
+from app.websocket.dispatcher import dispatcher, manager
+from app.local.backend import local_backend
 
-app = FastAPI(title="Bruteforce API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Один подписчик Redis на процесс для всех WebSocket соединений
+    dispatcher.ensure_started()
+    yield
+    await dispatcher.stop()
+    local_backend.shutdown()
+
+
+app = FastAPI(title="Bruteforce API", lifespan=lifespan)
 
 # Настройка CORS
 app.add_middleware(
@@ -16,6 +34,19 @@ app.add_middleware(
 # Подключаем роутер для брутфорса
 app.include_router(router, prefix="")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Метрики в текстовом формате Prometheus
+    """
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Метрики отключены")
+    # Запросы к Redis синхронные: не блокируем цикл событий
+    text = await run_in_threadpool(
+        metrics.collect, ("celery", SMALL_JOBS_QUEUE, LARGE_JOBS_QUEUE), manager.count()
+    )
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/")
 async def root():
     return {"message": "Bruteforce API работает!"} 
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Отмена и возобновление задачи на бэкенде Celery.
+
+Воркер запускается отдельным процессом, Redis — встроенный redislite во временном каталоге:
+    python -m pytest test_resume.py
+"""
+import asyncio
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Настройки читаются при импорте приложения
+os.environ["REDISLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bruteforce-test-"), "redis.db")
+os.environ["EXECUTION_BACKEND"] = "celery"
+os.environ["LOOKUP_INDEX_PATH"] = ""
+
+import httpx
+import pytest
+
+from app.celery.celery_app import celery_app
+from app.core.redis_client import get_redis
+from main import app
+
+# Пароли в конце пространства: перебор идет несколько секунд, его успевают отменить
+PASSWORDS = {False: "999999", True: "999998"}
+
+
+def make_request(sharded: bool) -> dict:
+    password = PASSWORDS[sharded]
+    return {
+        "hash_to_crack": hashlib.md5(password.encode()).hexdigest(),
+        "client_id": f"test-resume-{int(sharded)}",
+        "charset": "0123456789",
+        "max_length": len(password),
+        "sharded": sharded,
+    }
+
+
+@pytest.fixture(scope="module")
+def worker():
+    # Встроенный Redis запускает тест, воркер подключается к нему по тому же файлу базы
+    get_redis().ping()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "celery", "-A", "app.celery.celery_app", "worker", "-c", "2", "-l", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while not celery_app.control.ping(timeout=0.5):
+            if process.poll() is not None or time.monotonic() > deadline:
+                pytest.fail("Воркер Celery не запустился")
+        yield process
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+async def wait_status(client: httpx.AsyncClient, task_id: str, statuses: tuple, timeout: float = 60) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = (await client.get(f"/status/{task_id}")).json()
+        if status["status"] in statuses:
+            return status
+        await asyncio.sleep(0.1)
+    pytest.fail(f"Задача {task_id} не перешла в {statuses}: {status}")
+
+
+async def cancel_then_resume(sharded: bool) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        task_id = (await client.post("/start", json=make_request(sharded))).json()["task_id"]
+        await wait_status(client, task_id, ("running",))
+        assert (await client.post(f"/cancel/{task_id}")).json()["status"] == "cancelled"
+
+        response = (await client.post(f"/resume/{task_id}")).json()
+        assert response["task_id"] == task_id
+        assert response["status"] == "resumed"
+        # Отозванный id задачи Celery не переиспользуется: возобновленная задача доходит до конца
+        return await wait_status(client, task_id, ("cracked", "not_found", "error", "cancelled"))
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_cancel_then_resume(worker, monkeypatch, sharded):
+    from app.core.config import settings
+
+    # Шарды по 100 тысяч паролей, чтобы их было несколько
+    monkeypatch.setattr(settings, "BRUTEFORCE_SHARD_SIZE", 100000)
+
+    status = asyncio.run(cancel_then_resume(sharded))
+    assert status["status"] == "cracked"
+    assert status["result"] == PASSWORDS[sharded]
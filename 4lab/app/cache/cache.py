@@ -0,0 +1,64 @@
+import hashlib
+import os
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Request
+
+# Предел суммарного размера сохраненных ответов
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+class ResponseCache:
+    """
+    LRU кэш сериализованных ответов в памяти процесса.
+
+    Ключ ответа строится из адреса запроса и версий таблиц, от которых он
+    зависит. Пишущие обработчики увеличивают версию таблицы, и старые записи
+    больше не находятся, а со временем вытесняются. Ключ же служит ETag,
+    поэтому If-None-Match проверяется без обращения к базе.
+
+    Версии живут в процессе: при нескольких процессах uvicorn запись в одном
+    не сбрасывает кэш других.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.versions: Dict[str, int] = {}
+        self.entries: "OrderedDict[str, Tuple[bytes, Dict[str, str]]]" = OrderedDict()
+        # После перезапуска версии начинаются заново: ETag прошлого процесса не должен совпасть
+        self.instance = uuid.uuid4().hex
+
+    def bump(self, *tables: str):
+        for table in tables:
+            self.versions[table] = self.versions.get(table, 0) + 1
+
+    def etag(self, request: Request, tables: Iterable[str]) -> str:
+        query = "&".join(sorted(f"{name}={value}" for name, value in request.query_params.multi_items()))
+        versions = ",".join(f"{table}:{self.versions.get(table, 0)}" for table in tables)
+        key = f"{self.instance}|{request.url.path}?{query}|{versions}"
+        return f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+    def get(self, etag: str) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        entry = self.entries.get(etag)
+        if entry is not None:
+            self.entries.move_to_end(etag)
+        return entry
+
+    def put(self, etag: str, body: bytes, headers: Dict[str, str]):
+        if len(body) > self.max_bytes:
+            return
+        if etag in self.entries:
+            self.size -= len(self.entries.pop(etag)[0])
+        self.entries[etag] = (body, headers)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, (evicted, _) = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+response_cache = ResponseCache()
@@ -1,13 +1,85 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Настройки берутся из окружения (можно задать в .env)
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./library.db")
+# Асинхронный драйвер для той же базы: sqlite:// -> sqlite+aiosqlite://
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+)
+
+# Размер пула соединений, сколько соединений открывать сверх него и сколько секунд ждать свободного
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Соединений для записи в SQLite: писатель в базе все равно один, поэтому пишущие
+# запросы ждут очереди в пуле, а не в цикле повторов busy_timeout. Очередь не
+# отнимает процессор у чтения и укорачивает хвост задержек записи, но медиана
+# записи под нагрузкой выше: при большой доле записи значение стоит увеличить.
+# Замеры сценария mixed из benchmark.py — в README
+DB_WRITE_POOL_SIZE = int(os.getenv("DB_WRITE_POOL_SIZE", "1"))
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./library.db"
+# Параметры SQLite для каждого соединения
+SQLITE_PRAGMAS = {
+    # Читатели не блокируются писателем, а писатель — читателями
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    # В режиме WAL NORMAL не теряет целостность, но не делает fsync на каждый коммит
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Отрицательное значение — размер кэша страниц в КиБ
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Сколько миллисекунд ждать блокировку записи вместо ошибки "database is locked"
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),
+}
+
+is_sqlite = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+pool_options = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+}
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False} if is_sqlite else {},
+    poolclass=QueuePool,
+    **pool_options
+)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    **pool_options
 )
+# Для других СУБД отдельный пул для записи не нужен
+async_write_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=DB_WRITE_POOL_SIZE,
+    max_overflow=0,
+    pool_timeout=DB_POOL_TIMEOUT
+) if is_sqlite else async_engine
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+if is_sqlite:
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+    event.listen(async_write_engine.sync_engine, "connect", set_sqlite_pragmas)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: после commit объекты отдаются в ответ без повторной загрузки
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+AsyncWriteSessionLocal = async_sessionmaker(async_write_engine, expire_on_commit=False, autoflush=False)
 
 Base = declarative_base()
 
@@ -16,4 +88,12 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_write_db():
+    async with AsyncWriteSessionLocal() as db:
+        yield db
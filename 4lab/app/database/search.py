@@ -0,0 +1,93 @@
+import os
+
+from sqlalchemy import text
+
+# Сколько лучших совпадений доступно через страницы выдачи
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "5000"))
+
+# Полнотекстовый индекс книг: название и имя автора, rowid совпадает с books.id.
+# prefix='2 3' — отдельные индексы префиксов, чтобы запросы "хар*" не перебирали словарь
+CREATE_INDEX = """
+CREATE VIRTUAL TABLE books_fts USING fts5(
+    title, author_name,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+# Индекс обновляется триггерами, поэтому в синхроне и массовая загрузка, и запись мимо ORM
+TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, author_name)
+        VALUES (new.id, new.title, (SELECT name FROM authors WHERE id = new.author_id));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE ON books BEGIN
+        DELETE FROM books_fts WHERE rowid = old.id;
+        INSERT INTO books_fts(rowid, title, author_name)
+        VALUES (new.id, new.title, (SELECT name FROM authors WHERE id = new.author_id));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN
+        DELETE FROM books_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS authors_fts_update AFTER UPDATE OF name ON authors BEGIN
+        UPDATE books_fts SET author_name = new.name
+        WHERE rowid IN (SELECT id FROM books WHERE author_id = new.id);
+    END
+    """,
+]
+
+# Совпадения ранжируются внутри индекса, а с таблицами соединяется только страница.
+# bm25 считается для каждого совпадения, но сортировка с LIMIT хранит только
+# depth (смещение + размер страницы) лучших строк. Равные оценки упорядочены по id,
+# чтобы страницы разной глубины не меняли их местами. Название весит вдвое больше имени автора
+SEARCH_QUERY = text("""
+    SELECT books.id, books.title, books.year, books.author_id,
+           authors.name AS author_name, hits.rank
+    FROM (
+        SELECT rowid, bm25(books_fts, 2.0, 1.0) AS rank
+        FROM books_fts
+        WHERE books_fts MATCH :query
+        ORDER BY rank, rowid
+        LIMIT :depth
+    ) AS hits
+    JOIN books ON books.id = hits.rowid
+    LEFT JOIN authors ON authors.id = books.author_id
+    ORDER BY hits.rank, books.id
+    LIMIT :limit OFFSET :offset
+""")
+
+def ensure_search_index(engine):
+    """
+    Создает индекс и триггеры, если их нет. Новый индекс заполняется из уже существующих книг.
+    """
+    with engine.begin() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'")
+        ).first()
+        if not exists:
+            connection.execute(text(CREATE_INDEX))
+            connection.execute(text("""
+                INSERT INTO books_fts(rowid, title, author_name)
+                SELECT books.id, books.title, authors.name
+                FROM books LEFT JOIN authors ON authors.id = books.author_id
+            """))
+        for trigger in TRIGGERS:
+            connection.execute(text(trigger))
+
+def match_query(query: str, prefix: bool = True) -> str:
+    """
+    Запрос пользователя в синтаксисе FTS5: каждое слово в кавычках (операторы
+    и спецсимволы не интерпретируются), все слова обязательны, с prefix — как начало слова
+    """
+    terms = []
+    for word in query.split():
+        term = '"' + word.replace('"', '""') + '"'
+        terms.append(term + "*" if prefix else term)
+    return " ".join(terms)
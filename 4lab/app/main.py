@@ -1,73 +1,402 @@
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+import json
+from contextlib import asynccontextmanager
 
-from app.database.database import engine, get_db
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional, Tuple
+
+from app.cache.cache import response_cache
+from app.database.database import (
+    engine, async_engine, async_write_engine, get_async_db, get_async_write_db, AsyncSessionLocal, is_sqlite
+)
+from app.database.search import SEARCH_MAX_RESULTS, SEARCH_QUERY, ensure_search_index, match_query
 from app.models import models
 from app.schemas import schemas
 
 models.Base.metadata.create_all(bind=engine)
+# create_all не добавляет индексы в уже существующие таблицы
+for index in models.Book.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
+if is_sqlite:
+    ensure_search_index(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Соединения aiosqlite держат свои потоки: без закрытия процесс не завершится
+    await async_engine.dispose()
+    await async_write_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
+
+# Размер страницы по умолчанию и максимальный
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Сколько строк читать из курсора за раз в потоковом режиме
+STREAM_BATCH_SIZE = 1000
+# Сколько строк массовой загрузки вставлять одной транзакцией
+BULK_BATCH_SIZE = 5000
+
+# Сериализация ответов для кэша теми же схемами, что и response_model
+AUTHOR_ADAPTER = TypeAdapter(schemas.Author)
+AUTHORS_ADAPTER = TypeAdapter(List[schemas.Author])
+AUTHORS_WITH_BOOKS_ADAPTER = TypeAdapter(List[schemas.AuthorWithBooks])
+BOOKS_ADAPTER = TypeAdapter(List[schemas.Book])
+SEARCH_ADAPTER = TypeAdapter(List[schemas.SearchResult])
+# Заголовки пагинации — часть ответа и хранятся в кэше вместе с ним
+PAGINATION_HEADERS = ("X-Next-After", "X-Next-Offset")
+
+def cached(request: Request, *tables: str) -> Tuple[Optional[Response], str]:
+    """
+    Ответ без обращения к базе: 304, если у клиента актуальная версия,
+    или сохраненный ответ. Иначе None и ETag, под которым сохранить ответ.
+    """
+    etag = response_cache.etag(request, tables)
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers={"ETag": etag}), etag
+    entry = response_cache.get(etag)
+    if entry is not None:
+        body, headers = entry
+        return Response(body, media_type="application/json", headers={**headers, "ETag": etag}), etag
+    return None, etag
+
+def cache_response(etag: str, adapter: TypeAdapter, data, response: Optional[Response] = None) -> Response:
+    body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+    headers = {}
+    if response is not None:
+        headers = {name: response.headers[name] for name in PAGINATION_HEADERS if name in response.headers}
+    response_cache.put(etag, body, headers)
+    return Response(body, media_type="application/json", headers={**headers, "ETag": etag})
+
+async def paginate(db: AsyncSession, statement, column, response: Response,
+                   limit: Optional[int], after: Optional[int]):
+    """
+    Страница по ключу (keyset): строки с id больше after в порядке id.
+    Если страница заполнена, id последней строки возвращается в заголовке X-Next-After.
+    """
+    limit = limit or DEFAULT_PAGE_SIZE
+    if after is not None:
+        statement = statement.where(column > after)
+    items = (await db.scalars(statement.order_by(column).limit(limit))).all()
+    if len(items) == limit:
+        response.headers["X-Next-After"] = str(items[-1].id)
+    return items
+
+def stream_rows(statement, limit: Optional[int] = None):
+    """
+    Ответ в формате NDJSON: строки читаются курсором пачками и не превращаются
+    в ORM объекты, поэтому выгрузка всей таблицы занимает постоянную память
+    """
+    if limit is not None:
+        statement = statement.limit(limit)
+
+    async def generate():
+        # Своя сессия: генератор работает после возврата из эндпоинта
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(statement.execution_options(yield_per=STREAM_BATCH_SIZE))
+            async for row in result:
+                yield json.dumps(row._asdict(), ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+async def read_bulk_rows(request: Request):
+    """
+    Строки массовой загрузки: JSON массив или NDJSON (Content-Type: application/x-ndjson).
+    NDJSON читается по мере поступления и не загружается в память целиком.
+    Выдает пары (номер строки, объект или строка NDJSON).
+    """
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        index = 0
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, line
+                    index += 1
+        if buffer.strip():
+            yield index, buffer
+        return
+
+    try:
+        data = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный JSON")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=422, detail="Ожидается массив объектов")
+    for index, item in enumerate(data):
+        yield index, item
 
-app = FastAPI()
+def validate_rows(rows, schema, result: dict) -> list:
+    """
+    Проверяет строки схемой. Ошибки попадают в result, возвращаются корректные строки.
+    """
+    valid = []
+    for index, raw in rows:
+        try:
+            item = json.loads(raw) if isinstance(raw, bytes) else raw
+            valid.append((index, schema.model_validate(item).model_dump()))
+        except ValidationError as e:
+            error = "; ".join(
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}" if err["loc"] else err["msg"]
+                for err in e.errors()
+            )
+            result["errors"].append({"index": index, "error": error})
+        except ValueError:
+            result["errors"].append({"index": index, "error": "Некорректный JSON"})
+    return valid
+
+async def insert_rows(db: AsyncSession, model, rows: list, result: dict):
+    """
+    Вставляет пачку одним executemany в одной транзакции. Если пачка не вставилась,
+    строки вставляются по одной, чтобы ошибка касалась только плохих строк.
+    """
+    if not rows:
+        return
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    try:
+        ids = (await db.execute(statement, [row for _, row in rows])).scalars().all()
+        await db.commit()
+        response_cache.bump(model.__tablename__)
+        result["ids"].extend(ids)
+        return
+    except SQLAlchemyError:
+        await db.rollback()
+
+    for index, row in rows:
+        try:
+            result["ids"].append((await db.execute(insert(model).returning(model.id), row)).scalar_one())
+            await db.commit()
+            response_cache.bump(model.__tablename__)
+        except SQLAlchemyError as e:
+            await db.rollback()
+            result["errors"].append({"index": index, "error": str(getattr(e, "orig", None) or e)})
+
+async def load_authors(db: AsyncSession, rows: list, result: dict):
+    await insert_rows(db, models.Author, validate_rows(rows, schemas.AuthorCreate, result), result)
+
+async def load_books(db: AsyncSession, rows: list, result: dict):
+    valid = validate_rows(rows, schemas.BookCreate, result)
+    # Авторы всей пачки проверяются одним запросом
+    author_ids = {row["author_id"] for _, row in valid}
+    existing = set(await db.scalars(select(models.Author.id).where(models.Author.id.in_(author_ids))))
+    books = []
+    for index, row in valid:
+        if row["author_id"] in existing:
+            books.append((index, row))
+        else:
+            result["errors"].append({"index": index, "error": "Автор не найден"})
+    await insert_rows(db, models.Book, books, result)
+
+async def bulk_load(request: Request, db: AsyncSession, load_batch) -> dict:
+    """
+    Читает строки пачками по BULK_BATCH_SIZE и загружает каждую пачку одной транзакцией
+    """
+    result = {"ids": [], "errors": []}
+    batch = []
+    async for row in read_bulk_rows(request):
+        batch.append(row)
+        if len(batch) >= BULK_BATCH_SIZE:
+            await load_batch(db, batch, result)
+            batch = []
+    if batch:
+        await load_batch(db, batch, result)
+    result["inserted"] = len(result["ids"])
+    result["errors"].sort(key=lambda error: error["index"])
+    return result
 
 @app.get("/authors", response_model=List[schemas.Author])
-def get_authors(db: Session = Depends(get_db)):
-    return db.query(models.Author).all()
+async def get_authors(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    if stream:
+        statement = select(models.Author.id, models.Author.name).order_by(models.Author.id)
+        if after is not None:
+            statement = statement.where(models.Author.id > after)
+        return stream_rows(statement, limit)
+
+    hit, etag = cached(request, "authors")
+    if hit is not None:
+        return hit
+    authors = await paginate(db, select(models.Author), models.Author.id, response, limit, after)
+    return cache_response(etag, AUTHORS_ADAPTER, authors, response)
 
 @app.post("/authors", response_model=schemas.Author, status_code=201)
-def create_author(author: schemas.AuthorCreate, db: Session = Depends(get_db)):
+async def create_author(author: schemas.AuthorCreate, db: AsyncSession = Depends(get_async_write_db)):
     db_author = models.Author(**author.model_dump())
     db.add(db_author)
-    db.commit()
-    db.refresh(db_author)
+    await db.commit()
+    response_cache.bump("authors")
     return db_author
 
+@app.post("/authors/bulk", response_model=schemas.BulkResult)
+async def create_authors_bulk(request: Request, db: AsyncSession = Depends(get_async_write_db)):
+    """
+    Массовая загрузка авторов: JSON массив или NDJSON. Ошибки возвращаются по строкам.
+    """
+    return await bulk_load(request, db, load_authors)
+
+# Объявлен до /authors/{author_id}, иначе "with-books" разбиралось бы как id
+@app.get("/authors/with-books", response_model=List[schemas.AuthorWithBooks])
+async def get_authors_with_books(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Авторы страницы вместе с книгами: два запроса на страницу вместо запроса на каждого автора.
+    year_from и year_to ограничивают вложенные книги.
+    """
+    hit, etag = cached(request, "authors", "books")
+    if hit is not None:
+        return hit
+
+    conditions = []
+    if year_from is not None:
+        conditions.append(models.Book.year >= year_from)
+    if year_to is not None:
+        conditions.append(models.Book.year <= year_to)
+    books = models.Author.books.and_(*conditions) if conditions else models.Author.books
+    statement = select(models.Author).options(selectinload(books))
+    authors = await paginate(db, statement, models.Author.id, response, limit, after)
+    return cache_response(etag, AUTHORS_WITH_BOOKS_ADAPTER, authors, response)
+
 @app.get("/authors/{author_id}", response_model=schemas.Author)
-def get_author(author_id: int, db: Session = Depends(get_db)):
-    author = db.query(models.Author).filter(models.Author.id == author_id).first()
+async def get_author(author_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    hit, etag = cached(request, "authors")
+    if hit is not None:
+        return hit
+    author = await db.get(models.Author, author_id)
     if author is None:
         raise HTTPException(status_code=404, detail="Автор не найден")
-    return author
+    return cache_response(etag, AUTHOR_ADAPTER, author)
 
 @app.put("/authors/{author_id}", response_model=schemas.Author)
-def update_author(author_id: int, author: schemas.AuthorCreate, db: Session = Depends(get_db)):
-    db_author = db.query(models.Author).filter(models.Author.id == author_id).first()
+async def update_author(author_id: int, author: schemas.AuthorCreate, db: AsyncSession = Depends(get_async_write_db)):
+    db_author = await db.get(models.Author, author_id)
     if db_author is None:
         raise HTTPException(status_code=404, detail="Автор не найден")
     
     for key, value in author.model_dump().items():
         setattr(db_author, key, value)
     
-    db.commit()
-    db.refresh(db_author)
+    await db.commit()
+    response_cache.bump("authors")
     return db_author
 
 @app.delete("/authors/{author_id}", status_code=204)
-def delete_author(author_id: int, db: Session = Depends(get_db)):
-    author = db.query(models.Author).filter(models.Author.id == author_id).first()
+async def delete_author(author_id: int, db: AsyncSession = Depends(get_async_write_db)):
+    author = await db.get(models.Author, author_id)
     if author is None:
         raise HTTPException(status_code=404, detail="Автор не найден")
     
-    db.delete(author)
-    db.commit()
+    # Каскадное удаление книг через relationship требует загруженной коллекции
+    await db.refresh(author, ["books"])
+    await db.delete(author)
+    await db.commit()
+    response_cache.bump("authors", "books")
     return None
 
 @app.get("/books", response_model=List[schemas.Book])
-def get_books(author_id: int = None, db: Session = Depends(get_db)):
-    query = db.query(models.Book)
+async def get_books(
+    request: Request,
+    response: Response,
+    author_id: int = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    if stream:
+        statement = select(
+            models.Book.id, models.Book.title, models.Book.year, models.Book.author_id
+        ).order_by(models.Book.id)
+        if author_id:
+            statement = statement.where(models.Book.author_id == author_id)
+        if after is not None:
+            statement = statement.where(models.Book.id > after)
+        return stream_rows(statement, limit)
+
+    hit, etag = cached(request, "books")
+    if hit is not None:
+        return hit
+    statement = select(models.Book)
     if author_id:
-        query = query.filter(models.Book.author_id == author_id)
-    return query.all()
+        statement = statement.where(models.Book.author_id == author_id)
+    books = await paginate(db, statement, models.Book.id, response, limit, after)
+    return cache_response(etag, BOOKS_ADAPTER, books, response)
 
 @app.post("/books", response_model=schemas.Book, status_code=201)
-def create_book(book: schemas.BookCreate, db: Session = Depends(get_db)):
-    # Проверяем существование автора
-    author = db.query(models.Author).filter(models.Author.id == book.author_id).first()
+async def create_book(
+    book: schemas.BookCreate,
+    db: AsyncSession = Depends(get_async_db),
+    write_db: AsyncSession = Depends(get_async_write_db)
+):
+    # Проверяем существование автора по соединению для чтения:
+    # соединение для записи занято только вставкой
+    author = await db.get(models.Author, book.author_id)
     if not author:
         raise HTTPException(status_code=404, detail="Автор не найден")
+    await db.close()
     
     db_book = models.Book(**book.model_dump())
-    db.add(db_book)
-    db.commit()
-    db.refresh(db_book)
-    return db_book 
\ No newline at end of file
+    write_db.add(db_book)
+    await write_db.commit()
+    response_cache.bump("books")
+    return db_book
+
+@app.post("/books/bulk", response_model=schemas.BulkResult)
+async def create_books_bulk(request: Request, db: AsyncSession = Depends(get_async_write_db)):
+    """
+    Массовая загрузка книг: JSON массив или NDJSON. Авторы проверяются одним запросом на пачку.
+    """
+    return await bulk_load(request, db, load_books)
+
+@app.get("/search", response_model=List[schemas.SearchResult])
+async def search_books(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1),
+    prefix: bool = True,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Полнотекстовый поиск книг по названию и имени автора, лучшие совпадения первыми.
+    Все слова запроса обязательны, с prefix=true слово совпадает и с началом слова.
+    Если страница заполнена, смещение следующей возвращается в заголовке X-Next-Offset.
+    Страницы выдачи заканчиваются на SEARCH_MAX_RESULTS лучших совпадениях.
+    """
+    if not is_sqlite:
+        raise HTTPException(status_code=501, detail="Поиск доступен только для SQLite")
+    query = match_query(q, prefix)
+    if not query or offset >= SEARCH_MAX_RESULTS:
+        return []
+
+    hit, etag = cached(request, "authors", "books")
+    if hit is not None:
+        return hit
+    limit = min(limit or DEFAULT_PAGE_SIZE, SEARCH_MAX_RESULTS - offset)
+    rows = (await db.execute(SEARCH_QUERY, {
+        "query": query, "depth": offset + limit, "limit": limit, "offset": offset
+    })).all()
+    if len(rows) == limit and offset + limit < SEARCH_MAX_RESULTS:
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return cache_response(etag, SEARCH_ADAPTER, rows, response)
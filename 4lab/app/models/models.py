@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from app.database.database import Base
@@ -19,4 +19,9 @@ class Book(Base):
     year = Column(Integer)
     author_id = Column(Integer, ForeignKey("authors.id", ondelete="CASCADE"))
     
-    author = relationship("Author", back_populates="books") 
\ No newline at end of file
+    author = relationship("Author", back_populates="books")
+
+    # Книги авторов страницы с фильтром по годам выбираются по одному индексу
+    __table_args__ = (
+        Index("ix_books_author_id_year", "author_id", "year"),
+    ) 
\ No newline at end of file
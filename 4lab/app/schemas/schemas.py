@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import List, Optional
 from pydantic import BaseModel, validator
 
 class AuthorBase(BaseModel):
@@ -30,4 +31,21 @@ class Book(BookBase):
     id: int
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class AuthorWithBooks(Author):
+    books: List[Book]
+
+class SearchResult(Book):
+    author_name: Optional[str] = None
+    # Оценка bm25: чем меньше, тем выше книга в выдаче
+    rank: float
+
+class BulkError(BaseModel):
+    index: int
+    error: str
+
+class BulkResult(BaseModel):
+    inserted: int
+    ids: List[int]
+    errors: List[BulkError]
@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+# Слоги для названий и имен: из них же берутся слова поисковых запросов
+SYLLABLES = ["ка", "ли", "но", "ра", "ве", "то", "ми", "за", "да", "ре", "ску", "лан", "бор", "вик",
+             "stel", "mar", "lin", "dor", "ven", "tra", "ko", "ri", "an", "el"]
+
+ENDPOINTS = [
+    "GET /authors", "GET /authors/{id}", "GET /authors/with-books", "GET /books",
+    "GET /books?author_id", "GET /books?stream", "GET /search", "POST /books", "mixed",
+]
+
+
+def make_words(rng: random.Random, count: int) -> list:
+    return sorted({"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(count)})
+
+
+def seed_catalog(engine, authors: int, books: int, seed: int) -> list:
+    """
+    Заполняет пустую базу одинаковым при том же seed каталогом. Возвращает словарь слов.
+    Частоты слов убывают как 1/ранг, поэтому в поиске есть и редкие, и очень частые слова.
+    """
+    from sqlalchemy import insert
+
+    from app.models import models
+
+    rng = random.Random(seed)
+    words = make_words(rng, 5000)
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    with engine.begin() as connection:
+        connection.execute(insert(models.Author), [
+            {"name": " ".join(rng.choice(words).capitalize() for _ in range(2))} for _ in range(authors)
+        ])
+        for start in range(0, books, 10000):
+            connection.execute(insert(models.Book), [
+                {
+                    "title": " ".join(rng.choices(words, weights, k=rng.randint(1, 5))).capitalize(),
+                    "year": rng.randint(1800, 2020),
+                    "author_id": rng.randint(1, authors),
+                }
+                for _ in range(min(10000, books - start))
+            ])
+    return words
+
+
+def make_scenarios(authors: int, books: int, words: list, write_ratio: float) -> dict:
+    """
+    Запросы по эндпоинтам: для каждого функция, которая по rng выдает (метод, путь, параметры, тело).
+    mixed — страницы GET /books вперемешку с POST /books в доле write_ratio: чтение и запись
+    одновременно, как при подборе DB_WRITE_POOL_SIZE.
+    """
+    scenarios = {
+        "GET /authors": lambda rng: ("GET", "/authors", {"after": rng.randint(0, authors)}, None),
+        "GET /authors/{id}": lambda rng: ("GET", f"/authors/{rng.randint(1, authors)}", {}, None),
+        "GET /authors/with-books": lambda rng: (
+            "GET", "/authors/with-books", {"limit": 20, "after": rng.randint(0, authors)}, None),
+        "GET /books": lambda rng: ("GET", "/books", {"after": rng.randint(0, books)}, None),
+        "GET /books?author_id": lambda rng: ("GET", "/books", {"author_id": rng.randint(1, authors)}, None),
+        "GET /books?stream": lambda rng: (
+            "GET", "/books", {"stream": "true", "limit": 1000, "after": rng.randint(0, books)}, None),
+        "GET /search": lambda rng: ("GET", "/search", {"q": rng.choice(words)[:4], "limit": 20}, None),
+        "POST /books": lambda rng: ("POST", "/books", {}, {
+            "title": " ".join(rng.choices(words, k=3)).capitalize(),
+            "year": rng.randint(1800, 2020),
+            "author_id": rng.randint(1, authors),
+        }),
+    }
+    scenarios["mixed"] = lambda rng: (
+        scenarios["POST /books"] if rng.random() < write_ratio else scenarios["GET /books"])(rng)
+    return scenarios
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario, requests: int, concurrency: int, seed: int) -> dict:
+    """
+    requests запросов в concurrency параллельных клиентов. Возвращает задержки (мс), rps и ошибки
+    отдельно для каждого HTTP метода: в сценарии mixed чтение и запись оцениваются порознь.
+    """
+    rng = random.Random(seed)
+    calls = [scenario(rng) for _ in range(requests)]
+    latencies = {}
+    errors = {}
+
+    async def worker():
+        while calls:
+            method, path, params, body = calls.pop()
+            started = time.perf_counter()
+            response = await client.request(method, path, params=params, json=body)
+            latencies.setdefault(method, []).append((time.perf_counter() - started) * 1000)
+            errors[method] = errors.get(method, 0) + (response.status_code >= 400)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    results = {}
+    for method, values in latencies.items():
+        # quantiles нужны две точки, а в короткой разминке mixed запрос записи может быть один
+        points = values if len(values) > 1 else values * 2
+        p50, p95, p99 = (statistics.quantiles(points, n=100, method="inclusive")[i] for i in (49, 94, 98))
+        results[method] = {"rps": len(values) / elapsed, "p50": p50, "p95": p95, "p99": p99,
+                           "errors": errors[method]}
+    return results
+
+
+async def run_benchmark(args, scenarios: dict) -> dict:
+    from app.cache.cache import response_cache
+    from app.main import app
+
+    if not args.cache:
+        # Замеряется работа с базой, а не выдача сохраненных ответов
+        response_cache.max_bytes = 0
+    results = {}
+    # Lifespan вручную: ASGITransport его не запускает, а без него не закрываются пулы
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for name in args.endpoints:
+                await run_scenario(client, scenarios[name], args.warmup, args.concurrency, args.seed + 1)
+                by_method = await run_scenario(
+                    client, scenarios[name], args.requests, args.concurrency, args.seed)
+                for method, result in by_method.items():
+                    # Смешанный сценарий дает строку на каждый метод: "mixed GET", "mixed POST"
+                    label = name if len(by_method) == 1 else f"{name} {method}"
+                    results[label] = result
+                    print(f"{label:>24} {result['rps']:>8,.0f} {result['p50']:>8.1f} {result['p95']:>8.1f} "
+                          f"{result['p99']:>8.1f} {result['errors']:>7}")
+    return results
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Эндпоинты, у которых rps упал ниже baseline * (1 - tolerance)
+    или p95 вырос выше baseline * (1 + tolerance)
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        if result["rps"] < expected["rps"] * (1 - tolerance):
+            regressions.append((name, "rps", result["rps"], expected["rps"]))
+        if result["p95"] > expected["p95"] * (1 + tolerance):
+            regressions.append((name, "p95", result["p95"], expected["p95"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест API библиотеки на синтетическом каталоге")
+    parser.add_argument("--authors", type=int, default=1000, help="Количество авторов в каталоге")
+    parser.add_argument("--books", type=int, default=100000, help="Количество книг в каталоге")
+    parser.add_argument("--seed", type=int, default=1, help="Seed генератора каталога и запросов")
+    parser.add_argument("--db", help="Файл SQLite: если он существует, каталог не создается заново. "
+                                     "По умолчанию временный файл, удаляется после замера")
+    parser.add_argument("--requests", type=int, default=500, help="Запросов на эндпоинт")
+    parser.add_argument("--concurrency", type=int, default=10, help="Параллельных клиентов")
+    parser.add_argument("--warmup", type=int, default=20, help="Запросов на эндпоинт перед замером")
+    parser.add_argument("--cache", action="store_true", help="Не отключать кэш ответов")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="Доля записи в сценарии mixed")
+    parser.add_argument("--save", help="Сохранить результаты в JSON файл (новый baseline)")
+    parser.add_argument("--baseline", help="Сравнить с результатами из JSON файла")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Допустимое ухудшение rps и p95 относительно baseline (доля)")
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS, choices=ENDPOINTS,
+                        help="Эндпоинты для замера")
+    args = parser.parse_args()
+
+    temp_dir = None
+    db_path = args.db
+    if db_path is None:
+        temp_dir = tempfile.mkdtemp(prefix="library-benchmark-")
+        db_path = os.path.join(temp_dir, "library.db")
+    seeded = os.path.exists(db_path)
+    # Адрес базы читается при импорте app.database, поэтому приложение импортируется после
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(db_path)}"
+    from sqlalchemy import func, select
+
+    from app.database.database import engine
+    from app.models import models
+
+    # Импорт приложения создает таблицы, индексы и поисковый индекс
+    importlib.import_module("app.main")
+
+    try:
+        started = time.perf_counter()
+        if seeded:
+            words = make_words(random.Random(args.seed), 5000)
+            with engine.connect() as connection:
+                args.authors = connection.scalar(select(func.max(models.Author.id)))
+                args.books = connection.scalar(select(func.max(models.Book.id)))
+            print(f"Каталог из {db_path}: {args.authors} авторов, {args.books} книг")
+        else:
+            words = seed_catalog(engine, args.authors, args.books, args.seed)
+            print(f"Каталог: {args.authors} авторов, {args.books} книг за {time.perf_counter() - started:.1f} с")
+        engine.dispose()
+
+        print(f"{'эндпоинт':>24} {'rps':>8} {'p50 мс':>8} {'p95 мс':>8} {'p99 мс':>8} {'ошибок':>7}")
+        scenarios = make_scenarios(args.authors, args.books, words, args.write_ratio)
+        results = asyncio.run(run_benchmark(args, scenarios))
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print(f"Результаты сохранены в {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        for name, metric, value, expected in regressions:
+            print(f"❌ {name}: {metric} {value:,.1f}, baseline {expected:,.1f}")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ Результаты не хуже baseline (допуск {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()